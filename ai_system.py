@@ -0,0 +1,196 @@
+# AI System - Server-side opponent logic
+# This file lets the opponent play a whole turn against a Game instance in one call
+
+import math
+import random
+import time
+
+from card_registry import CARDS_BY_ID
+from game import END_TURN
+from solver import solve_last_turn
+
+# Difficulty tiers for the search opponent: wall-clock budget per turn (seconds), playout cap
+# and whether the final turn is solved exactly instead of searched
+DIFFICULTY_LEVELS = {
+    "easy": {"time_budget": 0.005, "max_playouts": 12, "solve_last_turn": False},
+    "medium": {"time_budget": 0.05, "max_playouts": 400, "solve_last_turn": False},
+    "hard": {"time_budget": 0.15, "max_playouts": 4000, "solve_last_turn": True},
+}
+
+
+class AIPlayer:
+    """Picks and applies plays for the computer-controlled side of a Game"""
+    
+    @staticmethod
+    def get_playable_moves(game, player="opponent"):
+        """Get every (card_index, location_index) pair the player can currently afford"""
+        return game.legal_moves(player)
+    
+    @staticmethod
+    def choose_move(game, player="opponent"):
+        """Choose a random playable card and location, or None if nothing can be played"""
+        moves = AIPlayer.get_playable_moves(game, player)
+        if not moves:
+            return None
+        return random.choice(moves)
+    
+    @staticmethod
+    def play_turn(game, player="opponent", difficulty=None):
+        """Play cards until nothing else is affordable, then end the turn.
+        
+        With a difficulty from DIFFICULTY_LEVELS the turn is planned by MCTSPlayer,
+        otherwise cards are played at random. Tiers that solve the last turn give the
+        solver half the time budget and search with what is left if it runs out.
+        Returns the list of plays made so the client can show them.
+        """
+        planned = None
+        if difficulty:
+            level = DIFFICULTY_LEVELS[difficulty]
+            deadline = time.perf_counter() + level["time_budget"]
+            if level["solve_last_turn"] and game.turn == game.max_turns:
+                solved = solve_last_turn(game, time_budget=level["time_budget"] / 2)
+                if solved is not None:
+                    planned = solved[0]
+            if planned is None:
+                planned, _ = MCTSPlayer.search(game, deadline - time.perf_counter(), level["max_playouts"])
+        
+        plays = []
+        while not game.game_over:
+            hand = game.player_hand if player == "player" else game.opponent_hand
+            if planned is None:
+                move = AIPlayer.choose_move(game, player)
+            elif planned and planned[0][0] in hand:
+                card_id, location_index = planned.pop(0)
+                move = (hand.index(card_id), location_index)
+            else:
+                move = None
+            if move is None:
+                break
+            
+            card_index, location_index = move
+            card_id = hand[card_index]
+            success, _ = game.play_card(card_index, location_index, player)
+            if not success:
+                break
+            
+            plays.append({
+                "card_id": card_id,
+                "card_name": CARDS_BY_ID[card_id]["name"],
+                "location_index": location_index
+            })
+        
+        success, message = game.end_turn()
+        return success, message, plays
+
+
+class _SearchNode:
+    """A move in the search tree, with the side that made it and its playout results"""
+    __slots__ = ("move", "player", "parent", "children", "visits", "wins", "available")
+    
+    def __init__(self, move, player, parent):
+        self.move = move
+        self.player = player
+        self.parent = parent
+        self.children = {}
+        self.visits = 0
+        self.wins = 0.0      # Wins for self.player, ties count half
+        self.available = 0   # Times this move was legal when its parent was visited
+
+
+class MCTSPlayer:
+    """Information set Monte Carlo tree search for the side to move.
+    
+    Every playout redeals the hidden hand with Game.determinize, walks one tree shared
+    by all deals, finishes the game with random plays and scores the result. Moves are
+    keyed by card id rather than hand index so they mean the same thing in every deal.
+    """
+    
+    EXPLORATION = 0.7
+    
+    @staticmethod
+    def search(game, time_budget=0.05, max_playouts=400, rng=None):
+        """Plan the side to move's turn.
+        
+        Runs playouts until time_budget seconds pass or max_playouts are done and returns
+        ([(card_id, location_index), ...] in play order, number of playouts). A playout
+        still running at the deadline is dropped.
+        """
+        deadline = time.perf_counter() + time_budget
+        rng = rng or random.Random()
+        player = game.current_player
+        root = _SearchNode(None, None, None)
+        
+        playouts = 0
+        while playouts < max_playouts and time.perf_counter() < deadline:
+            sample = game.determinize(player, rng)
+            node = MCTSPlayer._select(root, sample, rng)
+            if not MCTSPlayer._playout(sample, rng, deadline):
+                # Out of time before the game finished: forget the node this playout added
+                if node.visits == 0 and node.parent is not None:
+                    del node.parent.children[node.move]
+                break
+            
+            winner = sample.winner
+            while node is not None:
+                node.visits += 1
+                if winner == node.player:
+                    node.wins += 1
+                elif winner == "tie":
+                    node.wins += 0.5
+                node = node.parent
+            playouts += 1
+        
+        # Follow the most visited moves for as long as they are this side's plays
+        plays = []
+        node = root
+        while node.children:
+            node = max(node.children.values(), key=lambda child: child.visits)
+            if node.move == END_TURN or node.player != player:
+                break
+            plays.append(node.move)
+        return plays, playouts
+    
+    @staticmethod
+    def _moves(game):
+        """Get the side to move's moves keyed by (card_id, location_index), mapped to Game moves"""
+        hand = game.player_hand if game.current_player == "player" else game.opponent_hand
+        moves = {(hand[card_index], location_index): (card_index, location_index)
+                 for card_index, location_index in game.legal_moves()}
+        moves[END_TURN] = END_TURN
+        return moves
+    
+    @staticmethod
+    def _select(root, sample, rng):
+        """Walk down the tree with UCB1, playing moves on sample, and add one new node"""
+        node = root
+        while not sample.game_over:
+            moves = MCTSPlayer._moves(sample)
+            legal_children = [node.children[key] for key in moves if key in node.children]
+            for child in legal_children:
+                child.available += 1
+            
+            untried = [key for key in moves if key not in node.children]
+            if untried:
+                key = rng.choice(untried)
+                child = node.children[key] = _SearchNode(key, sample.current_player, node)
+                child.available = 1
+                sample.apply(moves[key], undoable=False)
+                return child
+            
+            node = max(legal_children, key=lambda child: child.wins / child.visits
+                       + MCTSPlayer.EXPLORATION * math.sqrt(math.log(child.available) / child.visits))
+            sample.apply(moves[node.move], undoable=False)
+        return node
+    
+    @staticmethod
+    def _playout(game, rng, deadline):
+        """Finish a game by playing random affordable cards until each side runs out.
+        
+        Returns False, leaving the game unfinished, if time.perf_counter() passes deadline first.
+        """
+        while not game.game_over:
+            if time.perf_counter() > deadline:
+                return False
+            moves = game.legal_moves()
+            game.apply(rng.choice(moves) if moves else END_TURN, undoable=False)
+        return True
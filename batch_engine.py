@@ -0,0 +1,480 @@
+# Batch Engine - NumPy scoring and play for many games at once
+# This file encodes N games as arrays so location power, winners and legal moves
+# can be computed for all of them in a few vectorized passes. It mirrors the rules
+# in game.py and effect_system.py and must give the same answers as Game.
+# BatchGames builds on it to deal and play whole games in lockstep for simulator.py.
+#
+# Usage: python batch_engine.py --games 2000 --seed 1   (checks results against Game)
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from card_registry import CARD_REGISTRY
+from effect_system import CARD_EFFECTS
+from locations_data import LOCATIONS
+
+MAX_CARDS_PER_LOCATION = 4
+NUM_LOCATIONS = 3
+PLAYER, OPPONENT = 0, 1
+EMPTY = 0  # Card id 0 marks an empty slot
+
+# Location effect codes
+LOCATION_EFFECT_CODES = {
+    "none": 0,
+    "cost_reduction": 1,
+    "power_boost": 2,
+    "reduce_all_power": 3,
+    "draw_card": 4,
+    "single_card_bonus": 5,
+}
+
+# Ongoing card effects that change power, as columns of CARD_AURAS
+AURA_OTHER_BOOST, AURA_WHEN_ALONE, AURA_REDUCE_OPPONENT, AURA_REDUCE_ALL = range(4)
+
+
+def _build_card_tables():
+    """Build power/cost/aura lookup tables indexed by card id"""
+    size = max(CARD_REGISTRY.ids) + 1
+    power = np.zeros(size, dtype=np.int32)
+    cost = np.zeros(size, dtype=np.int32)
+    auras = np.zeros((size, 4), dtype=np.int32)
+    for card in CARD_REGISTRY:
+        power[card["id"]] = card["power"]
+        cost[card["id"]] = card["cost"]
+        effects = CARD_EFFECTS[card["id"]]
+        auras[card["id"]] = (effects.other_cards_boost, effects.when_alone,
+                             effects.opponent_reduction, effects.all_reduction)
+    return power, cost, auras
+
+
+CARD_POWER, CARD_COST, CARD_AURAS = _build_card_tables()
+CARD_OTHER_BOOST, CARD_WHEN_ALONE, CARD_REDUCE_OPPONENT, CARD_REDUCE_ALL = CARD_AURAS.T.copy()
+
+
+def _slot_sum(values):
+    """Sum over the 4 slots of the last axis, keeping it; adding slices beats reducing a short axis"""
+    return (values[..., 0] + values[..., 1] + values[..., 2] + values[..., 3])[..., None]
+
+
+def _copies(slots, others):
+    """Count the cards in others (same shape as slots) equal to each slot's card"""
+    copies = (slots == others[..., 0:1]).astype(np.int32)
+    for k in range(1, MAX_CARDS_PER_LOCATION):
+        copies += slots == others[..., k:k + 1]
+    return copies
+
+
+class BatchBoards:
+    """N game boards stored as arrays.
+
+    slots:             (N, 3, 2, 4) card ids per location, side and slot (0 = empty)
+    location_effects:  (N, 3) location effect codes
+    location_values:   (N, 3) location effect values
+    """
+
+    def __init__(self, slots, location_effects, location_values):
+        self.slots = np.asarray(slots, dtype=np.int32)
+        self.location_effects = np.asarray(location_effects, dtype=np.int32)
+        self.location_values = np.asarray(location_values, dtype=np.int32)
+
+    @classmethod
+    def from_games(cls, games):
+        """Encode a list of Game instances"""
+        n = len(games)
+        slots = np.zeros((n, NUM_LOCATIONS, 2, MAX_CARDS_PER_LOCATION), dtype=np.int32)
+        location_effects = np.zeros((n, NUM_LOCATIONS), dtype=np.int32)
+        location_values = np.zeros((n, NUM_LOCATIONS), dtype=np.int32)
+        for g, game in enumerate(games):
+            for l, location in enumerate(game.locations):
+                location_effects[g, l] = LOCATION_EFFECT_CODES.get(location.effect_type, 0)
+                location_values[g, l] = location.effect_value
+                for side, player in ((PLAYER, "player"), (OPPONENT, "opponent")):
+                    cards = location.cards(player)
+                    slots[g, l, side, :len(cards)] = cards
+        return cls(slots, location_effects, location_values)
+
+    def card_powers(self):
+        """Get the modified power of every slot, shape (N, 3, 2, 4); empty slots are 0"""
+        slots = self.slots
+        occupied = slots != EMPTY
+        # Card id 0 has no auras, so empty slots add nothing to the side totals
+        other_boost = CARD_OTHER_BOOST[slots]
+        reduce_all = CARD_REDUCE_ALL[slots]
+
+        # Location effects
+        effects = self.location_effects[:, :, None, None]
+        values = self.location_values[:, :, None, None]
+        modifier = np.where(effects == LOCATION_EFFECT_CODES["power_boost"], values, 0)
+        modifier = modifier - np.where(effects == LOCATION_EFFECT_CODES["reduce_all_power"], values, 0)
+        alone = _slot_sum(occupied.astype(np.int32)) == 1  # (N, 3, 2, 1)
+        modifier = modifier + np.where((effects == LOCATION_EFFECT_CODES["single_card_bonus"]) & alone, values, 0)
+
+        # Cards only skip auras from cards equal to themselves (same id), like the dict comparison in Game,
+        # so each card gets its side's total less its own aura once per copy
+        own_copies = _copies(slots, slots)
+        opponent_copies = _copies(slots, slots[:, :, ::-1])
+        modifier = modifier + _slot_sum(other_boost) - own_copies * other_boost
+
+        # When alone bonus
+        modifier = modifier + np.where(alone, CARD_WHEN_ALONE[slots], 0)
+
+        # Opponent's reduce_opponent_power cards
+        modifier = modifier - _slot_sum(CARD_REDUCE_OPPONENT[slots])[:, :, ::-1]
+
+        # reduce_all_power cards on both sides, excluding equal cards
+        side_reduce_all = _slot_sum(reduce_all)
+        modifier = modifier - (side_reduce_all + side_reduce_all[:, :, ::-1]
+                               - (own_copies + opponent_copies) * reduce_all)
+
+        return np.where(occupied, CARD_POWER[slots] + modifier, 0)
+
+    def location_powers(self):
+        """Get total power per location and side, shape (N, 3, 2)"""
+        return _slot_sum(self.card_powers())[..., 0]
+
+    def winners(self, powers=None):
+        """Get the winner of each game: 1 player, -1 opponent, 0 tie.
+
+        powers: location_powers(), if the caller already has them
+        """
+        if powers is None:
+            powers = self.location_powers()
+        location_results = np.sign(powers[..., PLAYER] - powers[..., OPPONENT])  # (N, 3)
+        player_score = (location_results > 0).sum(axis=1)
+        opponent_score = (location_results < 0).sum(axis=1)
+        return np.sign(player_score - opponent_score)
+
+    def card_costs(self, hands, hand_cost_increase):
+        """Get the cost of every hand card at every location, shape (N, H, 3).
+
+        hands:              (N, H) card ids, 0 for empty hand slots
+        hand_cost_increase: (N,) extra cost for this side's hand
+        """
+        hands = np.asarray(hands, dtype=np.int32)
+        is_cost_reduction = self.location_effects == LOCATION_EFFECT_CODES["cost_reduction"]
+        local_reduction = np.where(is_cost_reduction, self.location_values, 0)   # (N, 3)
+        global_reduction = local_reduction.sum(axis=1)                           # (N,)
+        costs = (CARD_COST[hands][:, :, None]
+                 - local_reduction[:, None, :]
+                 + (np.asarray(hand_cost_increase) - global_reduction)[:, None, None])
+        return np.maximum(costs, 0)
+
+    def legal_move_mask(self, hands, energy, hand_cost_increase, side=PLAYER):
+        """Get which (hand card, location) plays are legal for one side, shape (N, H, 3)"""
+        hands = np.asarray(hands, dtype=np.int32)
+        costs = self.card_costs(hands, hand_cost_increase)
+        affordable = costs <= np.asarray(energy)[:, None, None]
+        has_room = (self.slots[:, :, side] != EMPTY).sum(axis=2) < MAX_CARDS_PER_LOCATION  # (N, 3)
+        in_hand = (hands != EMPTY)[:, :, None]
+        return affordable & has_room[:, None, :] & in_hand
+
+
+# On Reveal card effects that whole games handle, as columns of CARD_REVEALS
+REVEAL_DRAW, REVEAL_DESTROY, REVEAL_DESTROY_OPPONENT, REVEAL_HAND_COST = range(4)
+
+# Whole games keep each side's hand as a bitmask of card ids
+CARD_IDS = np.arange(CARD_POWER.shape[0])
+CARD_BITS = np.left_shift(np.uint64(1), CARD_IDS.astype(np.uint64))
+MAX_COST = int(CARD_COST.max())
+# Cards whose cost is at most b, at index b + 1 (index 0 is a negative budget)
+AFFORDABLE_MASKS = np.array([np.bitwise_or.reduce(CARD_BITS[1:][CARD_COST[1:] <= budget])
+                             for budget in range(-1, MAX_COST + 1)], dtype=np.uint64)
+# The greedy policy's preference: most expensive card first, then strongest
+CARD_STRENGTH = CARD_COST * (int(CARD_POWER.max()) + 1) + CARD_POWER
+EQUAL_STRENGTH_MASKS = np.array([np.bitwise_or.reduce(CARD_BITS[1:][CARD_STRENGTH[1:] == strength])
+                                 for strength in CARD_STRENGTH], dtype=np.uint64)
+
+
+def _build_reveal_table():
+    """Build the On Reveal lookup table indexed by card id.
+
+    Returns the table and the ids of cards with On Reveal effects it can't express,
+    which BatchGames refuses to play.
+    """
+    reveals = np.zeros((CARD_IDS.size, 4), dtype=np.int32)
+    unsupported = set()
+    for card in CARD_REGISTRY:
+        effects = CARD_EFFECTS[card["id"]]
+        if not effects.on_reveal:
+            continue
+        effect_type = effects.effect["type"]
+        if effect_type == "draw_cards":
+            reveals[card["id"], REVEAL_DRAW] = effects.effect["value"]
+        elif effect_type == "destroy_card":
+            column = REVEAL_DESTROY if effects.effect.get("target", "own") == "own" else REVEAL_DESTROY_OPPONENT
+            reveals[card["id"], column] = effects.effect.get("value", 1)
+        elif effect_type == "increase_hand_costs":
+            reveals[card["id"], REVEAL_HAND_COST] = effects.effect["value"]
+        else:
+            unsupported.add(card["id"])
+    return reveals, unsupported
+
+
+CARD_REVEALS, UNSUPPORTED_CARDS = _build_reveal_table()
+LOCATION_CODES = np.array([LOCATION_EFFECT_CODES.get(location["effect_type"], 0) for location in LOCATIONS],
+                          dtype=np.int32)
+LOCATION_VALUES = np.array([location["effect_value"] for location in LOCATIONS], dtype=np.int32)
+
+
+def mask_bits(masks):
+    """Expand card bitmasks to booleans by card id, adding a last axis of size C"""
+    return (masks[..., None] >> CARD_IDS.astype(np.uint64)) & np.uint64(1) != 0
+
+
+def random_moves(legal, rng):
+    """Pick one legal play per game, every legal play equally likely.
+
+    legal: (R, 3) bitmasks of the cards each game can play at each location
+    Returns (card_ids, locations).
+    """
+    counts = np.bitwise_count(legal).astype(np.int32)                  # (R, 3)
+    first, second = counts[:, 0], counts[:, 0] + counts[:, 1]
+    picks = (rng.random(legal.shape[0]) * (second + counts[:, 2])).astype(np.int32)
+    locations = (picks >= first).astype(np.intp) + (picks >= second)
+    rank = picks - np.where(locations == 0, 0, np.where(locations == 1, first, second))
+    # The pick is the rank-th lowest card id in the chosen location's mask
+    masks = legal[np.arange(legal.shape[0]), locations]
+    for step in range(int(rank.max(initial=0))):
+        masks = np.where(rank > step, masks & (masks - np.uint64(1)), masks)
+    card_ids = np.bitwise_count((masks & (~masks + np.uint64(1))) - np.uint64(1)).astype(np.intp)
+    return card_ids, locations
+
+
+def greedy_moves(legal, rng):
+    """Pick the most expensive playable card (the strongest on ties) and a random location it can go"""
+    playable = mask_bits(np.bitwise_or.reduce(legal, axis=1))          # (R, C)
+    best = np.where(playable, CARD_STRENGTH, -1).argmax(axis=1)
+    # Equal cards tie, and every play of them is equally likely like the random tiebreak in simulator.py
+    return random_moves(legal & EQUAL_STRENGTH_MASKS[best][:, None], rng)
+
+
+# Batch versions of simulator.POLICIES
+BATCH_POLICIES = {
+    "random": random_moves,
+    "greedy": greedy_moves,
+}
+
+
+class BatchGames:
+    """N whole games dealt and played in lockstep, following the turn structure of Game.
+
+    Each side holds one copy of each card in its deck, so hands and played cards are
+    bitmasks of card ids (bit c set for card c). Per-side arrays lead with the side:
+
+    decks:      (2, N, D) card ids in draw order
+    hands:      (2, N) bitmasks of the cards in hand
+    played:     (2, N) bitmasks of the cards played, destroyed cards included
+    energy, hand_cost_increase, drawn: (2, N)
+    boards:     BatchBoards with the cards in play and the locations
+
+    Every game is on the same turn and side at once; only the number of plays per
+    turn differs, so a side keeps playing in the games that still have a legal move.
+    Random choices (deals, policies, destroy targets) use a NumPy generator, so results
+    match Game in distribution rather than game for game.
+    """
+
+    def __init__(self, n, player_deck_ids=None, seed=None):
+        # The opponent always has every card, so any unsupported card could be played
+        if UNSUPPORTED_CARDS:
+            raise ValueError(f"Cards {sorted(UNSUPPORTED_CARDS)} have On Reveal effects BatchGames can't play")
+        if CARD_IDS.size > 64:
+            raise ValueError("BatchGames stores hands as 64 bit masks, so card ids must be below 64")
+        self.rng = np.random.default_rng(seed)
+        self.n = n
+        self.turn = 1
+        self.max_turns = 5
+        self.game_over = False
+        rows = np.arange(n)
+
+        # Decks: the player's chosen cards, topped up to 10 with random others like Game does
+        opponent_deck = np.tile(CARD_IDS[1:].astype(np.int32), (n, 1))
+        if player_deck_ids:
+            chosen = list(dict.fromkeys(card_id for card_id in player_deck_ids if card_id in CARD_REGISTRY.ids))
+            others = np.setdiff1d(CARD_IDS[1:], chosen).astype(np.int32)
+            fill = max(0, 10 - len(chosen))
+            extra = self.rng.permuted(np.tile(others, (n, 1)), axis=1)[:, :fill]
+            player_deck = np.concatenate([np.tile(np.array(chosen, dtype=np.int32), (n, 1)), extra], axis=1)
+        else:
+            player_deck = opponent_deck.copy()
+        self.deck_size = (player_deck.shape[1], opponent_deck.shape[1])
+        self.decks = np.zeros((2, n, opponent_deck.shape[1]), dtype=np.int32)
+        for side, deck in ((PLAYER, player_deck), (OPPONENT, opponent_deck)):
+            self.decks[side, :, :deck.shape[1]] = self.rng.permuted(deck, axis=1)
+        self.drawn = np.zeros((2, n), dtype=np.int32)
+
+        # Three different random locations per game
+        location_order = np.tile(np.arange(len(LOCATIONS)), (n, 1))
+        self.location_ids = self.rng.permuted(location_order, axis=1)[:, :NUM_LOCATIONS]
+        self.boards = BatchBoards(np.zeros((n, NUM_LOCATIONS, 2, MAX_CARDS_PER_LOCATION), dtype=np.int32),
+                                  LOCATION_CODES[self.location_ids], LOCATION_VALUES[self.location_ids])
+        # Cost change of every card at each location from cost_reduction locations, as in card_costs
+        local_reduction = np.where(self.boards.location_effects == LOCATION_EFFECT_CODES["cost_reduction"],
+                                   self.boards.location_values, 0)
+        self.cost_modifiers = -local_reduction - local_reduction.sum(axis=1, keepdims=True)   # (N, 3)
+        self.card_counts = np.zeros((2, n, NUM_LOCATIONS), dtype=np.int32)
+
+        self.hands = np.zeros((2, n), dtype=np.uint64)
+        self.played = np.zeros((2, n), dtype=np.uint64)
+        self.energy = np.ones((2, n), dtype=np.int32)
+        self.hand_cost_increase = np.zeros((2, n), dtype=np.int32)
+
+        for side in (PLAYER, OPPONENT):
+            self.draw_cards(rows, side, np.full(n, 3))
+
+    def draw_cards(self, rows, side, counts):
+        """Draw counts[i] cards for side in game rows[i], stopping when the deck runs out"""
+        counts = np.minimum(counts, self.deck_size[side] - self.drawn[side, rows])
+        for step in range(int(counts.max(initial=0))):
+            drawing = rows[counts > step]
+            self.hands[side, drawing] |= CARD_BITS[self.decks[side, drawing, self.drawn[side, drawing]]]
+            self.drawn[side, drawing] += 1
+
+    def legal_moves(self, rows, side):
+        """Get the cards side can play at each location in games rows, as (len(rows), 3) bitmasks.
+
+        Same rules as BatchBoards.legal_move_mask: a card is affordable when its base cost
+        fits the energy left after the location and hand cost modifiers.
+        """
+        budget = (self.energy[side, rows, None] - self.hand_cost_increase[side, rows, None]
+                  - self.cost_modifiers[rows])
+        affordable = AFFORDABLE_MASKS[np.clip(budget, -1, MAX_COST) + 1]
+        has_room = self.card_counts[side, rows] < MAX_CARDS_PER_LOCATION
+        return np.where(has_room, affordable & self.hands[side, rows, None], np.uint64(0))
+
+    def play_turn(self, side, choose_moves):
+        """Let side play until it has no legal move left in any game, then resolve the end of its turn"""
+        rows = np.arange(self.n)
+        pending_draws = np.zeros(self.n, dtype=np.int32)
+        while rows.size:
+            legal = self.legal_moves(rows, side)
+            can_play = legal.any(axis=1)
+            rows, legal = rows[can_play], legal[can_play]
+            if rows.size:
+                card_ids, locations = choose_moves(legal, self.rng)
+                self.play_cards(rows, side, card_ids, locations, pending_draws)
+        self.end_turn(side, pending_draws)
+
+    def play_cards(self, rows, side, card_ids, locations, pending_draws):
+        """Play one card per game, paying its cost and applying location and On Reveal effects"""
+        slots = self.boards.slots
+        costs = CARD_COST[card_ids] + self.cost_modifiers[rows, locations] + self.hand_cost_increase[side, rows]
+        self.energy[side, rows] -= np.maximum(costs, 0)
+        self.hands[side, rows] &= ~CARD_BITS[card_ids]
+        self.played[side, rows] |= CARD_BITS[card_ids]
+        # Cards fill a location's slots from the front, so the next free slot is the card count
+        slots[rows, locations, side, self.card_counts[side, rows, locations]] = card_ids
+        self.card_counts[side, rows, locations] += 1
+
+        # Location draw effects and On Reveal draws both happen at the end of the turn
+        is_draw_location = self.boards.location_effects[rows, locations] == LOCATION_EFFECT_CODES["draw_card"]
+        pending_draws[rows] += np.where(is_draw_location, self.boards.location_values[rows, locations], 0)
+        reveals = CARD_REVEALS[card_ids]
+        pending_draws[rows] += reveals[:, REVEAL_DRAW]
+        self.hand_cost_increase[side, rows] += reveals[:, REVEAL_HAND_COST]
+        for column, target in ((REVEAL_DESTROY, side), (REVEAL_DESTROY_OPPONENT, 1 - side)):
+            destroying = reveals[:, column] > 0
+            if destroying.any():
+                self.destroy_cards(rows[destroying], locations[destroying], target, card_ids[destroying],
+                                   reveals[destroying, column])
+
+    def destroy_cards(self, rows, locations, side, card_ids, counts):
+        """Destroy counts[i] random cards of side at a location, never ones equal to the card that did it"""
+        targets = self.boards.slots[rows, locations, side]                    # (R, 4)
+        candidates = (targets != EMPTY) & (targets != card_ids[:, None])
+        keys = np.where(candidates, self.rng.random(targets.shape), 2.0)
+        destroyed = candidates & (keys.argsort(axis=1).argsort(axis=1) < counts[:, None])
+        # Move the cards left to the front of the slots
+        remaining = np.where(destroyed, EMPTY, targets)
+        order = np.argsort(remaining == EMPTY, axis=1, kind="stable")
+        self.boards.slots[rows, locations, side] = np.take_along_axis(remaining, order, axis=1)
+        self.card_counts[side, rows, locations] -= destroyed.sum(axis=1, dtype=np.int32)
+
+    def end_turn(self, side, pending_draws):
+        """Resolve draws for the side that just played, and start the next turn after the opponent"""
+        rows = np.arange(self.n)
+        self.draw_cards(rows, side, pending_draws)
+        if side == PLAYER:
+            return
+        if self.turn < self.max_turns:
+            # Unused energy carries over on top of the new turn's energy
+            self.turn += 1
+            self.energy += min(self.turn, 6)
+            for draw_side in (PLAYER, OPPONENT):
+                self.draw_cards(rows, draw_side, np.ones(self.n, dtype=np.int32))
+        else:
+            self.game_over = True
+
+    def play(self, player_policy="random", opponent_policy="random"):
+        """Play every game to the end with policies named in BATCH_POLICIES; boards.winners() has the results"""
+        while not self.game_over:
+            self.play_turn(PLAYER, BATCH_POLICIES[player_policy])
+            self.play_turn(OPPONENT, BATCH_POLICIES[opponent_policy])
+
+
+def encode_hands(games, player="player"):
+    """Encode one side's hands, energy and cost increase for a list of games"""
+    hand_lists = [game.player_hand if player == "player" else game.opponent_hand for game in games]
+    width = max((len(hand) for hand in hand_lists), default=0)
+    hands = np.zeros((len(games), width), dtype=np.int32)
+    for g, hand in enumerate(hand_lists):
+        hands[g, :len(hand)] = hand
+    energy = np.array([game.player_energy if player == "player" else game.opponent_energy for game in games])
+    increase = np.array([game.player_hand_cost_increase if player == "player" else game.opponent_hand_cost_increase
+                         for game in games])
+    return hands, energy, increase
+
+
+def check_against_game(games):
+    """Count boards where the batch engine disagrees with Game"""
+    boards = BatchBoards.from_games(games)
+    powers = boards.location_powers()
+    winners = boards.winners()
+    hands, energy, increase = encode_hands(games)
+    mask = boards.legal_move_mask(hands, energy, increase)
+    winner_codes = {"player": 1, "opponent": -1, "tie": 0}
+
+    mismatches = 0
+    for g, game in enumerate(games):
+        expected_powers = [[game.calculate_location_power(location, side) for side in ("player", "opponent")]
+                           for location in game.locations]
+        game.calculate_winner()
+        expected_mask = np.zeros_like(mask[g])
+        for card_index, card_id in enumerate(game.player_hand):
+            for l, location in enumerate(game.locations):
+                expected_mask[card_index, l] = (game.calculate_card_cost(card_id, location, "player") <= game.player_energy
+                                                and len(location.player_cards) < MAX_CARDS_PER_LOCATION)
+        if (powers[g].tolist() != expected_powers or winners[g] != winner_codes[game.winner]
+                or not np.array_equal(mask[g], expected_mask)):
+            mismatches += 1
+    return mismatches
+
+
+if __name__ == "__main__":
+    from simulator import play_game, random_policy
+
+    parser = argparse.ArgumentParser(description="Check the batch engine against Game and time it")
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    games = [play_game(random_policy, random_policy)[0] for _ in range(args.games)]
+
+    start = time.perf_counter()
+    boards = BatchBoards.from_games(games)
+    encode_time = time.perf_counter() - start
+    start = time.perf_counter()
+    boards.winners()
+    score_time = time.perf_counter() - start
+
+    print(f"Encoded {len(games)} boards in {encode_time * 1000:.1f}ms, scored in {score_time * 1000:.1f}ms")
+    print(f"Mismatches against Game: {check_against_game(games)}")
+
+    start = time.perf_counter()
+    BatchGames(args.games, seed=args.seed).play()
+    play_time = time.perf_counter() - start
+    print(f"Played {args.games} whole games in lockstep in {play_time * 1000:.1f}ms "
+          f"({args.games / play_time:,.0f} games/sec)")
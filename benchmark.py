@@ -0,0 +1,265 @@
+# Benchmarks - Timings for the engine, persistence and API hot paths
+# This file builds mid- and late-game boards, times each hot path on them and compares
+# the results against a stored baseline. The API benchmarks drive the Flask app through
+# its test client against a temporary SQLite database, never the real one.
+#
+# Usage:
+#   python benchmark.py --save-baseline benchmark_baseline.json   (record a baseline)
+#   python benchmark.py --baseline benchmark_baseline.json --threshold 25
+#       (exits with status 1 if any path is more than 25% slower than its baseline)
+
+import argparse
+import json
+import os
+import pickle
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime
+
+from game import Game
+from game_codec import decode_game, encode_game
+from simulator import greedy_policy
+
+BOARD_TURNS = {"mid": 3, "late": 5}  # Turn each board is built up to (5 is the final turn)
+BOARD_SEED = 12345
+PLAYER_DECK = list(range(1, 11))
+
+
+def build_board(turn, seed=BOARD_SEED):
+    """Play greedy moves for both sides until it is the player's move on the given turn"""
+    random.seed(seed)  # The greedy policy breaks ties with the global RNG
+    game = Game(player_deck_ids=PLAYER_DECK, seed=seed)
+    while not game.game_over and game.turn < turn:
+        player = game.current_player
+        while (move := greedy_policy(game, player)) is not None:
+            game.play_card(move[0], move[1], player)
+        game.end_turn()
+    return game
+
+
+def time_call(function, repeat=5, min_time=0.2):
+    """Time a function like timeit: the best and median seconds per call over several runs"""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    runs = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+    return {"seconds": min(runs), "median": statistics.median(runs), "calls": number * repeat}
+
+
+def time_each(function, setup, runs=30):
+    """Time a function that needs a fresh setup() before every call (setup isn't timed)"""
+    durations = []
+    for _ in range(runs):
+        setup()
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return {"seconds": min(durations), "median": statistics.median(durations), "calls": runs}
+
+
+def engine_benchmarks():
+    """Time the Game methods every request goes through"""
+    results = {}
+    for board_name, turn in BOARD_TURNS.items():
+        game = build_board(turn)
+        results[f"engine.get_game_state[{board_name}]"] = time_call(game.get_game_state)
+        
+        def location_powers():
+            for location in game.locations:
+                game.calculate_location_power(location, "player")
+                game.calculate_location_power(location, "opponent")
+        
+        def location_powers_uncached():
+            for location in game.locations:
+                location.invalidate()
+            location_powers()
+        
+        results[f"engine.calculate_location_power[{board_name}]"] = time_call(location_powers)
+        results[f"engine.calculate_location_power_uncached[{board_name}]"] = time_call(location_powers_uncached)
+        results[f"engine.pickle_dumps[{board_name}]"] = time_call(lambda: pickle.dumps(game))
+        snapshot = pickle.dumps(game)
+        results[f"engine.pickle_loads[{board_name}]"] = time_call(lambda: pickle.loads(snapshot))
+        results[f"engine.encode_game[{board_name}]"] = time_call(lambda: encode_game(game))
+        blob = encode_game(game)
+        results[f"engine.decode_game[{board_name}]"] = time_call(lambda: decode_game(blob))
+    return results
+
+
+def api_benchmarks(runs=30):
+    """Time saving/loading games and /api/play-card against a temporary SQLite database"""
+    db_dir = tempfile.mkdtemp(prefix="greek_snap_bench_")
+    db_path = os.path.join(db_dir, "bench.db")
+    base_path = os.path.join(db_dir, "base.db")
+    os.environ["DB_URI"] = f"sqlite:///{db_path}"
+    if "main" in sys.modules:
+        raise RuntimeError("api_benchmarks() must import main itself so it uses the temporary database")
+    import main
+    
+    results = {}
+    try:
+        with main.app.app_context():
+            main.upgrade_database()
+        client = main.app.test_client()
+        client.post("/auth", data={"email": "benchmark@example.com"})
+        client.post("/register", data={"password": "benchmark", "confirm_password": "benchmark"})
+        client.post("/api/save-hand", json={"selected_cards": PLAYER_DECK, "hand_name": "Benchmark"})
+        client.post("/api/set-current-hand", json={"hand_index": 0})
+        _post(client, "/api/new-game")
+        with main.app.app_context():
+            user_id = main.User.query.filter_by(email="benchmark@example.com").first().id
+        
+        for board_name, turn in BOARD_TURNS.items():
+            results.update(_api_board_benchmarks(main, client, user_id, board_name, turn, db_path, base_path, runs))
+    finally:
+        main.game_cache.close()
+        with main.app.app_context():
+            main.db.engine.dispose()
+        shutil.rmtree(db_dir, ignore_errors=True)
+    return results
+
+
+def _post(client, url, data=None):
+    """Make an API request during setup, stopping if it fails"""
+    response = client.post(url, json=data)
+    if not response.json.get("success"):
+        raise RuntimeError(f"{url} failed during benchmark setup: {response.json.get('message')}")
+    return response
+
+
+def _api_board_benchmarks(main, client, user_id, board_name, turn, db_path, base_path, runs):
+    """Play a game through the API up to a turn, then time persistence and /api/play-card on it.
+    
+    Direct calls get their own app context; requests must run outside one so each
+    gets a fresh database session, as in production. The game cache is flushed before
+    reading the database and emptied before it is reset.
+    """
+    # Play through the API, so the saved rows look like a real game's
+    with main.app.app_context():
+        main.game_cache.flush(user_id)
+        game = main.load_game_state(user_id)
+    while not game.game_over and game.turn < turn:
+        random.seed(game.turn)
+        while (move := greedy_policy(game, "player")) is not None:
+            game.play_card(move[0], move[1], "player")
+            _post(client, "/api/play-card", {"card_index": move[0], "location_index": move[1]})
+        _post(client, "/api/end-turn")
+        _post(client, "/api/ai-turn", {"difficulty": "easy"})
+        with main.app.app_context():
+            main.game_cache.flush(user_id)
+            game = main.load_game_state(user_id)
+    moves = game.legal_moves("player")
+    move = moves[0] if moves else None
+    
+    def reset():
+        main.game_cache.discard(user_id)
+        with main.app.app_context():
+            main.db.engine.dispose()
+        shutil.copyfile(base_path, db_path)
+    
+    # Copy the database so every timed write starts from the same board
+    main.game_cache.discard(user_id)
+    with main.app.app_context():
+        main.db.engine.dispose()
+    shutil.copyfile(db_path, base_path)
+    
+    results = {}
+    with main.app.app_context():
+        results[f"persistence.load_game_state[{board_name}]"] = time_call(lambda: main.load_game_state(user_id),
+                                                                          repeat=3, min_time=0.1)
+        results[f"persistence.encode_game_snapshot[{board_name}]"] = time_call(lambda: main.encode_game_snapshot(game))
+    if move is None:
+        return results
+    
+    loaded = {}
+    
+    def load_and_play():
+        reset()
+        with main.app.app_context():
+            loaded["game"] = main.load_game_state(user_id)
+        loaded["game"].play_card(move[0], move[1], "player")
+    
+    def save():
+        with main.app.app_context():
+            main.save_game_state(user_id, loaded["game"])
+    
+    results[f"persistence.save_game_state[{board_name}]"] = time_each(save, load_and_play, runs)
+    results[f"api.play_card[{board_name}]"] = time_each(
+        lambda: client.post("/api/play-card", json={"card_index": move[0], "location_index": move[1]}),
+        reset, runs)
+    return results
+
+
+def run_benchmarks(include_api=True, runs=30):
+    """Run every benchmark and return the results document"""
+    results = engine_benchmarks()
+    if include_api:
+        results.update(api_benchmarks(runs))
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Get (name, baseline seconds, current seconds, change) rows and the names that regressed.
+    
+    A path regresses when its best time is more than threshold percent slower than
+    the baseline's. Paths missing from either side are skipped.
+    """
+    rows = []
+    regressions = []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before = baseline["results"][name]["seconds"]
+        after = result["seconds"]
+        change = (after - before) / before if before else 0.0
+        rows.append((name, before, after, change))
+        if change * 100 > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def print_results(document):
+    """Print each path's timings"""
+    for name, result in document["results"].items():
+        print(f"  {name:<55} {result['seconds'] * 1e6:12,.1f} us  (median {result['median'] * 1e6:,.1f} us)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time Greek Snap's engine and API hot paths")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results as the new baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against this baseline")
+    parser.add_argument("--threshold", type=float, default=25.0,
+                        help="percent slower than the baseline that counts as a regression (default 25)")
+    parser.add_argument("--runs", type=int, default=30, help="requests timed per API benchmark")
+    parser.add_argument("--skip-api", action="store_true", help="only run the engine benchmarks")
+    args = parser.parse_args()
+    
+    document = run_benchmarks(include_api=not args.skip_api, runs=args.runs)
+    print_results(document)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as file:
+                json.dump(document, file, indent=2)
+    
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        rows, regressions = compare(document, baseline, args.threshold)
+        print(f"\nAgainst {args.baseline} (threshold {args.threshold:g}%):")
+        for name, before, after, change in rows:
+            flag = "  REGRESSION" if name in regressions else ""
+            print(f"  {name:<55} {before * 1e6:12,.1f} -> {after * 1e6:12,.1f} us  {change:+7.1%}{flag}")
+        if regressions:
+            print(f"\n{len(regressions)} path(s) regressed past {args.threshold:g}%")
+            sys.exit(1)
@@ -0,0 +1,96 @@
+# Card Registry - Read-only card lookups built once from cards_data.py
+# Use this instead of scanning CHARACTERS whenever a card is looked up by id or name
+
+from types import MappingProxyType
+
+from cards_data import CHARACTERS
+
+
+class CardRegistry:
+    """Immutable indexes over a list of card definitions"""
+
+    def __init__(self, cards):
+        by_id = {}
+        by_name = {}
+        by_ability_type = {}
+        by_cost = {}
+
+        for card in cards:
+            if card["id"] in by_id:
+                raise ValueError(f"Duplicate card id {card['id']}: "
+                                 f"'{by_id[card['id']]['name']}' and '{card['name']}'")
+            if card["name"] in by_name:
+                raise ValueError(f"Duplicate card name '{card['name']}' (ids {by_name[card['name']]['id']} and {card['id']})")
+            by_id[card["id"]] = card
+            by_name[card["name"]] = card
+            by_ability_type.setdefault(card.get("ability_type", "none"), []).append(card)
+            by_cost.setdefault(card["cost"], []).append(card)
+
+        self.by_id = MappingProxyType(by_id)
+        self.by_name = MappingProxyType(by_name)
+        self.by_ability_type = MappingProxyType({key: tuple(value) for key, value in by_ability_type.items()})
+        self.by_cost = MappingProxyType({key: tuple(value) for key, value in by_cost.items()})
+        self.ids = tuple(by_id)
+        self.names = MappingProxyType({card_id: card["name"] for card_id, card in by_id.items()})
+
+    def __getitem__(self, card_id):
+        return self.by_id[card_id]
+
+    def __contains__(self, card_id):
+        return card_id in self.by_id
+
+    def __iter__(self):
+        return iter(self.by_id.values())
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def get(self, card_id, default=None):
+        """Get a card by id"""
+        return self.by_id.get(card_id, default)
+
+    def get_by_name(self, name, default=None):
+        """Get a card by name"""
+        return self.by_name.get(name, default)
+
+    def with_ability_type(self, ability_type):
+        """Get all cards with an ability type ("ongoing", "on_reveal" or "none")"""
+        return self.by_ability_type.get(ability_type, ())
+
+    def with_cost(self, cost):
+        """Get all cards with a base cost"""
+        return self.by_cost.get(cost, ())
+
+
+# Card sets as bitmasks: bit n is set when card id n is in the set. Unlocked cards are stored
+# this way in a signed 64-bit column, so card ids must stay below CARD_MASK_BITS.
+CARD_MASK_BITS = 63
+
+
+def card_mask(card_ids):
+    """Get the bitmask of some card ids"""
+    mask = 0
+    for card_id in card_ids:
+        if not 0 <= card_id < CARD_MASK_BITS:
+            raise ValueError(f"Card id {card_id} doesn't fit in a card mask")
+        mask |= 1 << card_id
+    return mask
+
+
+def mask_has_card(mask, card_id):
+    """Check whether a card id is in a bitmask (False for anything that isn't a card id)"""
+    return isinstance(card_id, int) and 0 <= card_id < CARD_MASK_BITS and bool(mask >> card_id & 1)
+
+
+def card_ids_in_mask(mask):
+    """Get the card ids in a bitmask, in order (the list view of a mask)"""
+    return [card_id for card_id in range(mask.bit_length()) if mask >> card_id & 1]
+
+
+CARD_REGISTRY = CardRegistry(CHARACTERS)
+
+# Shortcut for hot paths that only need id -> card
+CARDS_BY_ID = CARD_REGISTRY.by_id
+
+# Every card (also checks at import that all card ids fit in a mask)
+ALL_CARDS_MASK = card_mask(CARD_REGISTRY.ids)
@@ -276,7 +276,7 @@ CHARACTERS = [
 # Template for adding new cards:
 """
 {
-    "id": 11,
+    "id": 21,
     "name": "New Character",
     "power": 4,
     "cost": 3,
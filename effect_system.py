@@ -1,107 +1,64 @@
 # Effect System - Centralized effect handling
 # This system makes it easy to add new effects without modifying the main game logic
+# Cards in play are card ids; their static data is looked up in the card registry
+#
+# Effects are declared in CARD_EFFECT_REGISTRY and LOCATION_EFFECT_REGISTRY below and
+# compiled once at import into CARD_EFFECTS and LOCATION_EFFECTS, so playing and scoring
+# cards reads plain numbers and handlers instead of comparing effect type strings.
+
+from card_registry import CARD_REGISTRY
+from locations_data import LOCATIONS
 
 class EffectHandler:
     """Centralized handler for all card and location effects"""
     
     @staticmethod
-    def apply_card_ability(card, location, player, game_instance):
-        """Apply a card's ability effect"""
-        if not card.get("ability_effect"):
-            return
-        
-        effect = card["ability_effect"]
-        effect_type = effect["type"]
-        
-        if effect_type == "draw_cards":
-            EffectHandler._draw_cards(effect["value"], player, game_instance)
-        elif effect_type == "destroy_card":
-            EffectHandler._destroy_card(effect, location, player, game_instance, card)
-        elif effect_type == "increase_hand_costs":
-            EffectHandler._increase_hand_costs(effect["value"], player, game_instance)
-        elif effect_type == "power_boost":
-            # Power boosts are handled in power calculation, not here
-            pass
-        elif effect_type == "reduce_opponent_power":
-            # Power reductions are handled in power calculation, not here
-            pass
-        elif effect_type == "reduce_all_power":
-            # Power reductions are handled in power calculation, not here
-            pass
+    def apply_card_ability(card_id, location, player, game_instance):
+        """Apply a card's On Reveal effect"""
+        effects = CARD_EFFECTS[card_id]
+        if effects.on_reveal:
+            effects.on_reveal(effects.effect, card_id, location, player, game_instance)
     
     @staticmethod
     def apply_location_effect(location, player, game_instance):
         """Apply a location's effect when a card is played"""
-        effect_type = location.get("effect_type")
-        
-        if effect_type == "draw_card":
-            # Delay draw card effects until end of turn
-            game_instance.pending_location_draw_effects.append({
-                "player": player,
-                "count": location["effect_value"]
-            })
+        on_play = location.effects.on_play
+        if on_play:
+            on_play(location, player, game_instance)
     
     @staticmethod
     def process_pending_location_draw_effects(game_instance):
         """Process all pending location draw effects at end of turn"""
-        for effect in game_instance.pending_location_draw_effects:
-            EffectHandler._draw_cards(effect["count"], effect["player"], game_instance)
+        for player, count in game_instance.pending_location_draw_effects:
+            EffectHandler._draw_cards(count, player, game_instance)
         game_instance.pending_location_draw_effects.clear()
     
     @staticmethod
-    def calculate_card_cost_modifier(card, location):
+    def calculate_card_cost_modifier(card_id, location):
         """Calculate cost modifications from location effects"""
-        effect_type = location.get("effect_type")
-        
-        if effect_type == "cost_reduction":
-            return -location["effect_value"]
-        
-        return 0
+        return location.effects.cost
     
     @staticmethod
-    def calculate_card_power_modifier(card, location, player_cards, opponent_cards):
+    def calculate_card_power_modifier(card_id, location, player):
         """Calculate power modifications from location and card effects"""
-        total_modifier = 0
-        
-        # Location effects
-        effect_type = location.get("effect_type")
-        if effect_type == "power_boost":
-            total_modifier += location["effect_value"]
-        elif effect_type == "single_card_bonus" and len(player_cards) == 1:
-            total_modifier += location["effect_value"]
-        elif effect_type == "reduce_all_power":
-            total_modifier -= location["effect_value"]
+        location_effects = location.effects
+        card = CARD_EFFECTS[card_id]
+        own = location.auras(player)
+        opponent = location.auras("opponent" if player == "player" else "player")
+        total_modifier = location_effects.power
         
-        # Card ability effects (ongoing)
-        for other_card in player_cards:
-            if (other_card != card and 
-                other_card.get("ability_type") == "ongoing" and 
-                other_card.get("ability_effect") and
-                other_card["ability_effect"]["type"] == "power_boost" and
-                other_card["ability_effect"]["target"] == "other_cards"):
-                total_modifier += other_card["ability_effect"]["value"]
+        # Single card bonuses from the location and the card's own when alone ability
+        if own.card_count == 1:
+            total_modifier += location_effects.single_card_bonus + card.when_alone
         
-        # Check if this card has a "when alone" ability
-        if (card.get("ability_type") == "ongoing" and 
-            card.get("ability_effect") and
-            card["ability_effect"]["type"] == "when_alone" and
-            len(player_cards) == 1):
-            total_modifier += card["ability_effect"]["value"]
+        # Ongoing effects of the other cards on this side (cards don't affect themselves or equal cards)
+        own_copies = own.card_counts.get(card_id, 0)
+        total_modifier += own.other_cards_boost - own_copies * card.other_cards_boost
+        total_modifier -= own.all_reduction - own_copies * card.all_reduction
         
-        # Opponent card effects (ongoing)
-        for opponent_card in opponent_cards:
-            if (opponent_card.get("ability_type") == "ongoing" and 
-                opponent_card.get("ability_effect") and
-                opponent_card["ability_effect"]["type"] == "reduce_opponent_power"):
-                total_modifier -= opponent_card["ability_effect"]["value"]
-        
-        # All cards power reduction effects (ongoing)
-        for all_card in player_cards + opponent_cards:
-            if (all_card.get("ability_type") == "ongoing" and 
-                all_card.get("ability_effect") and
-                all_card["ability_effect"]["type"] == "reduce_all_power" and
-                all_card != card):  # Don't apply to the card that has the ability
-                total_modifier -= all_card["ability_effect"]["value"]
+        # Ongoing effects of the opponent's cards
+        total_modifier -= opponent.opponent_reduction
+        total_modifier -= opponent.all_reduction - opponent.card_counts.get(card_id, 0) * card.all_reduction
         
         return total_modifier
     
@@ -111,34 +68,33 @@ class EffectHandler:
         game_instance.draw_cards(count, player)
     
     @staticmethod
-    def _destroy_card(effect, location, player, game_instance, triggering_card=None):
+    def _destroy_card(effect, location, player, game_instance, triggering_card_id=None):
         """Helper method to destroy a card"""
-        import random
-        
         target = effect.get("target", "own")  # "own" or "opponent"
         count = effect.get("value", 1)  # Number of cards to destroy
         
-        # Get the appropriate card list
+        # Get the appropriate side
         if target == "own":
-            cards_to_destroy = location["player_cards"] if player == "player" else location["opponent_cards"]
+            side = player
         else:  # opponent
-            cards_to_destroy = location["opponent_cards"] if player == "player" else location["player_cards"]
+            side = "opponent" if player == "player" else "player"
+        cards_to_destroy = location.cards(side)
         
         # Filter out the triggering card (so it doesn't destroy itself)
         available_cards = []
-        for i, card in enumerate(cards_to_destroy):
-            if triggering_card is None or card != triggering_card:
+        for i, card_id in enumerate(cards_to_destroy):
+            if triggering_card_id is None or card_id != triggering_card_id:
                 available_cards.append(i)
         
         # Destroy the specified number of cards randomly
         destroyed_count = min(count, len(available_cards))
         if destroyed_count > 0:
             # Randomly select cards to destroy
-            cards_to_remove = random.sample(available_cards, destroyed_count)
+            cards_to_remove = game_instance.rng.sample(available_cards, destroyed_count)
             # Remove cards in reverse order to maintain correct indices
             for index in sorted(cards_to_remove, reverse=True):
-                cards_to_destroy.pop(index)
-
+                location.remove_card(side, index)
+    
     @staticmethod
     def _increase_hand_costs(increase_amount, player, game_instance):
         """Helper method to increase costs of all cards in hand"""
@@ -149,75 +105,198 @@ class EffectHandler:
             game_instance.opponent_hand_cost_increase = getattr(game_instance, 'opponent_hand_cost_increase', 0) + increase_amount
 
 # Effect Registry - Easy way to add new effects
-EFFECT_REGISTRY = {
-    # Card effects
+#
+# phase:     "on_reveal" effects run once when the card is played ("immediate") or at turn end
+#            ("end_of_turn"); "ongoing" effects change power while the card is in play
+# handler:   on_reveal handlers are called as handler(effect, card_id, location, player, game)
+# modifiers: ongoing effects add effect["value"] * sign to each named CardEffects total
+CARD_EFFECT_REGISTRY = {
     "draw_cards": {
         "description": "Draw cards when triggered",
         "parameters": ["value"],
-        "handler": lambda effect, player, game: game.draw_cards(effect["value"], player)
+        "phase": "on_reveal",
+        "timing": "end_of_turn",
+        "handler": lambda effect, card_id, location, player, game: EffectHandler._draw_cards(effect["value"], player, game)
     },
-    "power_boost": {
-        "description": "Boost power of cards",
+    "destroy_card": {
+        "description": "Destroy cards from the location",
         "parameters": ["value", "target"],
-        "handler": None  # Handled in power calculation
+        "phase": "on_reveal",
+        "timing": "immediate",
+        "handler": lambda effect, card_id, location, player, game: EffectHandler._destroy_card(effect, location, player, game, card_id)
     },
-    "reduce_opponent_power": {
-        "description": "Reduce opponent card power",
+    "increase_hand_costs": {
+        "description": "Increase cost of all cards in hand",
         "parameters": ["value"],
-        "handler": None  # Handled in power calculation
+        "phase": "on_reveal",
+        "timing": "immediate",
+        "handler": lambda effect, card_id, location, player, game: EffectHandler._increase_hand_costs(effect["value"], player, game)
     },
-    "reduce_all_power": {
-        "description": "Reduce power of all cards at location",
-        "parameters": ["value"],
-        "handler": None  # Handled in power calculation
+    "power_boost": {
+        "description": "Boost power of the other cards on your side of the location",
+        "parameters": ["value", "target"],
+        "phase": "ongoing",
+        "target": "other_cards",
+        "modifiers": {"other_cards_boost": 1}
     },
     "when_alone": {
         "description": "Boost power when this card is the only one at the location",
         "parameters": ["value"],
-        "handler": None  # Handled in power calculation
+        "phase": "ongoing",
+        "modifiers": {"when_alone": 1}
     },
-    "destroy_card": {
-        "description": "Destroy cards from the location",
-        "parameters": ["value", "target"],
-        "handler": lambda effect, location, player, game, card: EffectHandler._destroy_card(effect, location, player, game, card)
+    "reduce_opponent_power": {
+        "description": "Reduce opponent card power",
+        "parameters": ["value"],
+        "phase": "ongoing",
+        "modifiers": {"opponent_reduction": 1}
     },
-    "increase_hand_costs": {
-        "description": "Increase cost of all cards in hand",
+    "reduce_all_power": {
+        "description": "Reduce power of all other cards at location",
         "parameters": ["value"],
-        "handler": lambda effect, player, game: EffectHandler._increase_hand_costs(effect["value"], player, game)
+        "phase": "ongoing",
+        "modifiers": {"all_reduction": 1}
     },
-    
-    # Location effects
+}
+
+# handler:   called as handler(location, player, game) whenever a card is played here
+# modifiers: add effect_value * sign to each named LocationEffects total
+LOCATION_EFFECT_REGISTRY = {
     "cost_reduction": {
-        "description": "Reduce cost of cards",
+        "description": "Reduce cost of cards here, and of all cards by the same amount",
         "parameters": ["value"],
-        "handler": None  # Handled in cost calculation
+        "modifiers": {"cost": -1, "global_cost": -1}
     },
     "power_boost": {
         "description": "Boost power of cards at location",
         "parameters": ["value"],
-        "handler": None  # Handled in power calculation
+        "modifiers": {"power": 1}
     },
     "reduce_all_power": {
         "description": "Reduce power of all cards at location",
         "parameters": ["value"],
-        "handler": None  # Handled in power calculation
+        "modifiers": {"power": -1}
     },
     "single_card_bonus": {
         "description": "Bonus when only one card present",
         "parameters": ["value"],
-        "handler": None  # Handled in power calculation
-    }
+        "modifiers": {"single_card_bonus": 1}
+    },
+    "draw_card": {
+        "description": "Draw cards at the end of the turn when a card is played here",
+        "parameters": ["value"],
+        # Delay draw card effects until end of turn
+        "handler": lambda location, player, game: game.pending_location_draw_effects.append((player, location.effect_value))
+    },
 }
 
+
+class CardEffects:
+    """A card's effect resolved against CARD_EFFECT_REGISTRY"""
+    __slots__ = ("card_id", "effect", "on_reveal", "on_reveal_immediate",
+                 "other_cards_boost", "when_alone", "opponent_reduction", "all_reduction")
+    
+    def __init__(self, card):
+        self.card_id = card["id"]
+        self.effect = card.get("ability_effect")
+        self.on_reveal = None
+        self.on_reveal_immediate = False
+        self.other_cards_boost = 0
+        self.when_alone = 0
+        self.opponent_reduction = 0
+        self.all_reduction = 0
+        
+        if not self.effect or self.effect["type"] == "none":
+            return
+        entry = CARD_EFFECT_REGISTRY.get(self.effect["type"])
+        if entry is None:
+            raise ValueError(f"Card '{card['name']}' has unknown effect type '{self.effect['type']}'")
+        
+        # Effects only work with their own ability type (see CARD_CREATION_GUIDE.md)
+        if entry["phase"] != card.get("ability_type"):
+            return
+        if "target" in entry and self.effect.get("target") != entry["target"]:
+            return
+        if entry["phase"] == "on_reveal":
+            self.on_reveal = entry["handler"]
+            self.on_reveal_immediate = entry["timing"] == "immediate"
+        for field, sign in entry.get("modifiers", {}).items():
+            setattr(self, field, getattr(self, field) + sign * self.effect["value"])
+
+
+class LocationEffects:
+    """A location's effect resolved against LOCATION_EFFECT_REGISTRY"""
+    __slots__ = ("power", "single_card_bonus", "cost", "global_cost", "on_play")
+    
+    def __init__(self, location):
+        self.power = 0
+        self.single_card_bonus = 0
+        self.cost = 0
+        self.global_cost = 0
+        self.on_play = None
+        
+        entry = LOCATION_EFFECT_REGISTRY.get(location["effect_type"])
+        if entry is None:
+            raise ValueError(f"Location '{location['name']}' has unknown effect type '{location['effect_type']}'")
+        self.on_play = entry.get("handler")
+        for field, sign in entry.get("modifiers", {}).items():
+            setattr(self, field, getattr(self, field) + sign * location["effect_value"])
+
+
+class AuraTotals:
+    """Running totals of the ongoing effects of one side's cards at a location.
+    
+    Kept up to date as cards enter and leave, so scoring a card is a few
+    subtractions instead of a pass over every card at the location.
+    """
+    __slots__ = ("card_count", "card_counts", "other_cards_boost", "opponent_reduction", "all_reduction")
+    
+    def __init__(self, card_ids=()):
+        self.card_count = 0
+        self.card_counts = {}  # card_id -> copies on this side, so equal cards can skip each other's auras
+        self.other_cards_boost = 0
+        self.opponent_reduction = 0
+        self.all_reduction = 0
+        for card_id in card_ids:
+            self.add(card_id)
+    
+    def add(self, card_id):
+        """Count a card entering this side"""
+        effects = CARD_EFFECTS[card_id]
+        self.card_count += 1
+        self.card_counts[card_id] = self.card_counts.get(card_id, 0) + 1
+        self.other_cards_boost += effects.other_cards_boost
+        self.opponent_reduction += effects.opponent_reduction
+        self.all_reduction += effects.all_reduction
+    
+    def remove(self, card_id):
+        """Count a card leaving this side"""
+        effects = CARD_EFFECTS[card_id]
+        self.card_count -= 1
+        if self.card_counts[card_id] == 1:
+            del self.card_counts[card_id]
+        else:
+            self.card_counts[card_id] -= 1
+        self.other_cards_boost -= effects.other_cards_boost
+        self.opponent_reduction -= effects.opponent_reduction
+        self.all_reduction -= effects.all_reduction
+
+
+# Compiled effects, by card id and by index into LOCATIONS
+CARD_EFFECTS = {card["id"]: CardEffects(card) for card in CARD_REGISTRY}
+LOCATION_EFFECTS = [LocationEffects(location) for location in LOCATIONS]
+
 # Template for adding new effects:
 """
-# Add to EFFECT_REGISTRY:
+# Add to CARD_EFFECT_REGISTRY (or LOCATION_EFFECT_REGISTRY for locations):
 "new_effect_type": {
     "description": "What this effect does",
     "parameters": ["param1", "param2"],
-    "handler": lambda effect, player, game: your_custom_logic(effect, player, game)
+    "phase": "on_reveal",
+    "timing": "immediate",
+    "handler": lambda effect, card_id, location, player, game: your_custom_logic(effect, player, game)
 }
 
-# Then implement the logic in the appropriate method above
-""" 
\ No newline at end of file
+# Ongoing power effects use "phase": "ongoing" and "modifiers" instead of a handler.
+# A new kind of modifier needs a field on CardEffects and a line in calculate_card_power_modifier.
+"""
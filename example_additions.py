@@ -3,7 +3,7 @@
 
 # To add a new card, simply add it to cards_data.py:
 NEW_CARD_EXAMPLE = {
-    "id": 11,
+    "id": 21,
     "name": "Black Panther",
     "power": 4,
     "cost": 4,
@@ -1,51 +1,288 @@
+import os
 import random
-from cards_data import CHARACTERS
+from card_registry import CARD_REGISTRY, CARDS_BY_ID
 from locations_data import LOCATIONS
-from effect_system import EffectHandler
+from effect_system import CARD_EFFECTS, LOCATION_EFFECTS, AuraTotals, EffectHandler
+from zobrist import HAND_KEYS, MASK, location_card_key, mix64, scalar_key
+
+# Index of each location in LOCATIONS by name, for games saved before locations were stored by index
+LOCATION_IDS_BY_NAME = {location["name"]: i for i, location in enumerate(LOCATIONS)}
+
+# Move that ends the current side's turn; every other move is a (card_index, location_index) play
+END_TURN = "E"
+
+
+class GameRandom(random.Random):
+    """random.Random driven by a single 64-bit SplitMix64 state.
+    
+    Every shuffle, sample and choice a Game makes goes through its own GameRandom,
+    so the seed alone reproduces a game. The whole state is one int, which keeps
+    saved games small and makes copying a game's RNG free.
+    """
+    _MASK = (1 << 64) - 1
+    
+    def seed(self, a=None, version=2):
+        if a is None:
+            a = int.from_bytes(os.urandom(8), "big")
+        self._state = a & self._MASK
+        self.gauss_next = None
+    
+    def _next(self):
+        self._state = z = (self._state + 0x9E3779B97F4A7C15) & self._MASK
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & self._MASK
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & self._MASK
+        return z ^ (z >> 31)
+    
+    def random(self):
+        return (self._next() >> 11) * (1.0 / 9007199254740992.0)
+    
+    def getrandbits(self, k):
+        if k <= 64:
+            return self._next() >> (64 - k) if k else 0
+        bits = 0
+        for shift in range(0, k, 64):
+            bits |= self._next() << shift
+        return bits & ((1 << k) - 1)
+    
+    def _randbelow(self, n):
+        # Same draws as random.Random's getrandbits version (shuffle, choice, sample and
+        # randrange all come through here), without its extra call per draw
+        shift = 64 - n.bit_length()
+        r = self._next() >> shift
+        while r >= n:
+            r = self._next() >> shift
+        return r
+    
+    def shuffle(self, x):
+        # random.Random.shuffle with _randbelow and _next inlined, since every new game
+        # shuffles two decks. Makes exactly the same draws.
+        mask = self._MASK
+        state = self._state
+        for i in range(len(x) - 1, 0, -1):
+            n = i + 1
+            shift = 64 - n.bit_length()
+            while True:
+                state = z = (state + 0x9E3779B97F4A7C15) & mask
+                z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & mask
+                z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & mask
+                j = (z ^ (z >> 31)) >> shift
+                if j < n:
+                    break
+            x[i], x[j] = x[j], x[i]
+        self._state = state
+    
+    def getstate(self):
+        return self._state
+    
+    def setstate(self, state):
+        self._state = state
+    
+    def __reduce__(self):
+        return self.__class__, (self._state,)
+
+
+class Location:
+    """A location in play.
+    
+    Static location data lives once in LOCATIONS; a Location only stores its index
+    there and the ids of the cards each side has played to it.
+    
+    Cards should enter and leave through add_card() and remove_card(), which keep
+    each side's aura totals and the Zobrist hash of the cards here current. Modified
+    card powers are cached per side and recalculated after any change.
+    """
+    __slots__ = ("location_id", "effect_type", "effect_value", "effects", "player_cards", "opponent_cards",
+                 "player_auras", "opponent_auras", "card_hash", "_power_cache")
+    
+    def __init__(self, location_id, player_cards=None, opponent_cards=None):
+        data = LOCATIONS[location_id]
+        self.location_id = location_id
+        self.effect_type = data["effect_type"]
+        self.effect_value = data["effect_value"]
+        self.effects = LOCATION_EFFECTS[location_id]
+        self.player_cards = player_cards if player_cards is not None else []
+        self.opponent_cards = opponent_cards if opponent_cards is not None else []
+        self.player_auras = AuraTotals(self.player_cards)
+        self.opponent_auras = AuraTotals(self.opponent_cards)
+        self.card_hash = self._calculate_card_hash()
+        self._power_cache = None  # {player: (card_powers, total_power)} or None when dirty
+    
+    @property
+    def name(self):
+        return LOCATIONS[self.location_id]["name"]
+    
+    def cards(self, player):
+        """Get the card ids a side has played here"""
+        return self.player_cards if player == "player" else self.opponent_cards
+    
+    def auras(self, player):
+        """Get the running aura totals for a side's cards here"""
+        return self.player_auras if player == "player" else self.opponent_auras
+    
+    def add_card(self, player, card_id):
+        """Play a card to a side of this location"""
+        if player == "player":
+            self.player_cards.append(card_id)
+            self.player_auras.add(card_id)
+        else:
+            self.opponent_cards.append(card_id)
+            self.opponent_auras.add(card_id)
+        self.card_hash = (self.card_hash + location_card_key(self.location_id, player, card_id)) & MASK
+        self._power_cache = None
+    
+    def remove_card(self, player, index):
+        """Remove the card at an index from a side of this location and return its id"""
+        if player == "player":
+            card_id = self.player_cards.pop(index)
+            self.player_auras.remove(card_id)
+        else:
+            card_id = self.opponent_cards.pop(index)
+            self.opponent_auras.remove(card_id)
+        self.card_hash = (self.card_hash - location_card_key(self.location_id, player, card_id)) & MASK
+        self._power_cache = None
+        return card_id
+    
+    def invalidate(self):
+        """Rebuild aura totals and the card hash and drop cached powers after the card lists were changed directly"""
+        self.player_auras = AuraTotals(self.player_cards)
+        self.opponent_auras = AuraTotals(self.opponent_cards)
+        self.card_hash = self._calculate_card_hash()
+        self._power_cache = None
+    
+    def _calculate_card_hash(self):
+        """Get the Zobrist hash of the cards on both sides here"""
+        card_hash = 0
+        for player, cards in (("player", self.player_cards), ("opponent", self.opponent_cards)):
+            for card_id in cards:
+                card_hash += location_card_key(self.location_id, player, card_id)
+        return card_hash & MASK
+    
+    def _calculate_powers(self):
+        """Recalculate modified card powers and totals for both sides"""
+        cache = {}
+        for player, cards in (("player", self.player_cards), ("opponent", self.opponent_cards)):
+            card_powers = [
+                CARDS_BY_ID[card_id]["power"] + EffectHandler.calculate_card_power_modifier(card_id, self, player)
+                for card_id in cards
+            ]
+            cache[player] = (card_powers, sum(card_powers))
+        self._power_cache = cache
+        return cache
+    
+    def card_powers(self, player):
+        """Get the modified power of each of a side's cards here, in play order"""
+        cache = self._power_cache or self._calculate_powers()
+        return cache[player][0]
+    
+    def total_power(self, player):
+        """Get a side's total power here"""
+        cache = self._power_cache or self._calculate_powers()
+        return cache[player][1]
+    
+    def to_dict(self):
+        """Get the location in the dict shape sent to the client"""
+        data = LOCATIONS[self.location_id]
+        return {
+            "name": data["name"],
+            "effect": data["effect"],
+            "effect_type": data["effect_type"],
+            "effect_value": data["effect_value"],
+            "background_image": data.get("background_image", ""),
+        }
+
 
 class Game:
-    def __init__(self, player_deck_ids=None):
+    # Attributes saved when a game is pickled. Cards are stored as ids and locations
+    # as (location_id, player_cards, opponent_cards), so saved games stay small.
+    # New fields go at the end so older saved games still load.
+    _STATE_FIELDS = (
+        "turn", "max_turns", "current_player",
+        "player_hand", "opponent_hand", "player_deck", "opponent_deck", "locations",
+        "player_energy", "opponent_energy", "player_unused_energy", "opponent_unused_energy",
+        "game_over", "winner", "pending_on_reveal_effects", "pending_location_draw_effects",
+        "player_hand_cost_increase", "opponent_hand_cost_increase",
+        "game_id", "state_version", "change_log",
+        "seed", "rng", "action_count", "player_deck_ids",
+    )
+    
+    # Number of versions kept in the change log; older clients get a full snapshot
+    CHANGE_LOG_SIZE = 8
+    
+    # Plain game_state fields that are sent as-is when they change
+    _SIMPLE_STATE_FIELDS = (
+        "turn", "current_player", "player_energy", "opponent_energy",
+        "player_unused_energy", "opponent_unused_energy", "game_over", "winner",
+        "player_hand_cost_increase", "opponent_hand_cost_increase",
+    )
+    # Parts of the state tracked in the change log, one bit each; locations follow these bits
+    _STATE_PARTS = _SIMPLE_STATE_FIELDS + ("player_hand", "opponent_hand")
+    _PART_BITS = {name: 1 << i for i, name in enumerate(_STATE_PARTS)}
+    
+    # Plain fields saved by apply() and put back by undo()
+    _UNDO_FIELDS = _SIMPLE_STATE_FIELDS
+    
+    # Integer fields folded into position_hash()
+    _HASHED_FIELDS = (
+        "turn", "player_energy", "opponent_energy", "player_unused_energy", "opponent_unused_energy",
+        "player_hand_cost_increase", "opponent_hand_cost_increase", "game_over",
+    )
+    
+    def __init__(self, player_deck_ids=None, seed=None, track_changes=True):
+        # All randomness goes through this game's own generator, so the same seed,
+        # deck and actions always replay to the same game
+        self.seed = seed if seed is not None else int.from_bytes(os.urandom(4), "big") >> 1
+        self.rng = GameRandom(self.seed)
+        self.player_deck_ids = list(player_deck_ids) if player_deck_ids else None  # Deck the game was created with
+        self.action_count = 0  # Number of successful actions (play card / end turn) so far
+        self.new_actions = []  # Actions taken since the game was created or loaded, not saved yet
+        self._undo_stack = []  # Records for moves made with apply(), newest last
+        
         self.turn = 1
         self.max_turns = 5
         self.current_player = "player"  # Track whose turn it is
-        self.player_hand = []
+        self.player_hand = []  # Card ids
         self.opponent_hand = []
+        self._hand_hashes = {"player": 0, "opponent": 0}  # Zobrist hash of each hand
         
         # Set up player deck based on selected hand
         if player_deck_ids:
             # Create deck from selected card IDs (only one copy of each)
-            self.player_deck = []
-            for card_id in player_deck_ids:
-                card = next((c for c in CHARACTERS if c['id'] == card_id), None)
-                if card:
-                    self.player_deck.append(card)
+            self.player_deck = [card_id for card_id in player_deck_ids if card_id in CARDS_BY_ID]
             # If we have fewer than 10 cards, add some random cards to fill the deck
             if len(self.player_deck) < 10:
-                remaining_cards = [c for c in CHARACTERS if c['id'] not in player_deck_ids]
-                random.shuffle(remaining_cards)
+                selected_ids = set(player_deck_ids)
+                remaining_cards = [card_id for card_id in CARD_REGISTRY.ids if card_id not in selected_ids]
+                self.rng.shuffle(remaining_cards)
                 self.player_deck.extend(remaining_cards[:10 - len(self.player_deck)])
         else:
             # Default deck (all cards)
-            self.player_deck = CHARACTERS.copy()
+            self.player_deck = list(CARD_REGISTRY.ids)
         
         # Opponent always uses all cards
-        self.opponent_deck = CHARACTERS.copy()
+        self.opponent_deck = list(CARD_REGISTRY.ids)
         
         self.locations = []
+        self._reset_location_caches()
         self.player_energy = 1
         self.opponent_energy = 1
         self.player_unused_energy = 0
         self.opponent_unused_energy = 0
         self.game_over = False
         self.winner = None
-        self.pending_on_reveal_effects = []  # Store On Reveal effects to process at turn end
-        self.pending_location_draw_effects = []  # Store location draw effects to process at turn end
+        self.pending_on_reveal_effects = []  # (card_id, location_index, player) On Reveal effects to process at turn end
+        self.pending_location_draw_effects = []  # (player, count) location draw effects to process at turn end
         self.player_hand_cost_increase = 0  # Global cost increase for player's hand
         self.opponent_hand_cost_increase = 0  # Global cost increase for opponent's hand
+        self.game_id = int.from_bytes(os.urandom(4), "big")  # Lets clients tell games apart when versions match
+        self.state_version = 0  # Increases by one after every action that changes the game
+        self.change_log = []  # (state_version, bitmask of changed parts) for the most recent versions
+        # Whether actions bump state_version and fill change_log; headless games that never
+        # send deltas turn it off to skip diffing the state on every action
+        self.track_changes = track_changes
         
         # Shuffle decks
-        random.shuffle(self.player_deck)
-        random.shuffle(self.opponent_deck)
+        self.rng.shuffle(self.player_deck)
+        self.rng.shuffle(self.opponent_deck)
         
         # Draw initial hands
         self.draw_cards(3, "player")
@@ -54,6 +291,124 @@ class Game:
         # Set up locations
         self.setup_locations()
     
+    def __getstate__(self):
+        state = [getattr(self, name) for name in self._STATE_FIELDS]
+        state[self._STATE_FIELDS.index("locations")] = tuple(
+            (location.location_id, location.player_cards, location.opponent_cards)
+            for location in self.locations
+        )
+        return tuple(state)
+    
+    def __setstate__(self, state):
+        if isinstance(state, dict):
+            state = self._legacy_state(state)
+        # Defaults for fields added after a game was saved
+        self.game_id = 0
+        self.state_version = 0
+        self.change_log = []
+        self.seed = 0
+        self.rng = GameRandom()
+        self.action_count = 0
+        self.player_deck_ids = None
+        for name, value in zip(self._STATE_FIELDS, state):
+            setattr(self, name, value)
+        self.new_actions = []
+        self._undo_stack = []
+        self.track_changes = True
+        self.locations = [Location(*location) for location in self.locations]
+        self._reset_location_caches()
+        self._rehash_hands()
+    
+    @classmethod
+    def _legacy_state(cls, state):
+        """Convert the __dict__ of a game pickled before cards became ids into a state tuple"""
+        def card_id(card):
+            return card["id"] if isinstance(card, dict) else card
+        
+        def location_state(location):
+            if isinstance(location, dict):
+                return (LOCATION_IDS_BY_NAME[location["name"]],
+                        [card_id(card) for card in location["player_cards"]],
+                        [card_id(card) for card in location["opponent_cards"]])
+            return (location.location_id, location.player_cards, location.opponent_cards)
+        
+        state = dict(state)
+        for name in ("player_hand", "opponent_hand", "player_deck", "opponent_deck"):
+            state[name] = [card_id(card) for card in state.get(name, [])]
+        state["locations"] = [location_state(location) for location in state.get("locations", [])]
+        state["pending_on_reveal_effects"] = [
+            (card_id(effect["card"]), effect["location_index"], effect["player"]) if isinstance(effect, dict) else effect
+            for effect in state.get("pending_on_reveal_effects", [])
+        ]
+        state["pending_location_draw_effects"] = [
+            (effect["player"], effect["count"]) if isinstance(effect, dict) else effect
+            for effect in state.get("pending_location_draw_effects", [])
+        ]
+        # Fields the old game did not have are left to the defaults in __setstate__
+        fields = []
+        for name in cls._STATE_FIELDS:
+            if name not in state:
+                break
+            fields.append(state[name])
+        return tuple(fields)
+    
+    def fork(self):
+        """Get an independent copy of this game, including its RNG position, without deepcopy"""
+        clone = Game.__new__(Game)
+        state = list(self.__getstate__())
+        for i, value in enumerate(state):
+            if isinstance(value, list):
+                state[i] = value.copy()
+        clone.__setstate__(state)
+        clone.locations = [Location(location.location_id, location.player_cards.copy(), location.opponent_cards.copy())
+                           for location in self.locations]
+        clone.rng = GameRandom(self.rng.getstate())
+        clone.track_changes = self.track_changes
+        return clone
+    
+    def determinize(self, player, rng):
+        """Get a fork of the game as player might picture it, with hidden information redrawn.
+        
+        The other side's hand is redealt from every card it hasn't played (its hand and
+        deck), both decks are reshuffled and the fork gets a new RNG seed, all from rng.
+        """
+        clone = self.fork()
+        other = "opponent" if player == "player" else "player"
+        hidden_hand = clone.player_hand if other == "player" else clone.opponent_hand
+        hidden_deck = clone.player_deck if other == "player" else clone.opponent_deck
+        
+        unseen_cards = hidden_hand + hidden_deck
+        rng.shuffle(unseen_cards)
+        hidden_hand[:] = unseen_cards[:len(hidden_hand)]
+        hidden_deck[:] = unseen_cards[len(hidden_hand):]
+        rng.shuffle(clone.player_deck if player == "player" else clone.opponent_deck)
+        clone.rng.seed(rng.getrandbits(64))
+        clone._hand_costs[other] = None
+        clone._rehash_hands()
+        return clone
+    
+    def position_hash(self):
+        """Get a 64-bit Zobrist hash of the position.
+        
+        Covers the cards at each location and in each hand, which are kept up to date as
+        cards move, plus whose turn it is, the turn, energy and hand cost increases.
+        Deck order, the RNG and pending effects are not included.
+        """
+        position_hash = (self._locations_hash + self._hand_hashes["player"] + self._hand_hashes["opponent"]
+                         + scalar_key(len(self._HASHED_FIELDS), self.current_player == "player"))
+        for location in self.locations:
+            position_hash += location.card_hash
+        for field, name in enumerate(self._HASHED_FIELDS):
+            position_hash += scalar_key(field, getattr(self, name))
+        return position_hash & MASK
+    
+    def _rehash_hands(self):
+        """Recalculate both hand hashes after the hands were replaced"""
+        self._hand_hashes = {
+            player: sum(HAND_KEYS[player][card_id] for card_id in hand) & MASK
+            for player, hand in (("player", self.player_hand), ("opponent", self.opponent_hand))
+        }
+    
     def is_player_turn(self, player_id=None):
         """Check if it's the player's turn"""
         return self.current_player == "player"
@@ -75,29 +430,25 @@ class Game:
         
         for _ in range(min(count, len(deck))):
             if deck:
-                card = deck.pop()
-                hand.append(card)
+                card_id = deck.pop()
+                hand.append(card_id)
+                self._hand_hashes[player] = (self._hand_hashes[player] + HAND_KEYS[player][card_id]) & MASK
+                cached = self._hand_costs[player]
+                if cached is not None:
+                    cached[1].append(self._card_cost_row(card_id, cached[0]))
     
     def setup_locations(self):
         # Select 3 random locations
-        selected_locations = random.sample(LOCATIONS, 3)
-        self.locations = [
-            {
-                "name": loc["name"],
-                "effect": loc["effect"],
-                "effect_type": loc["effect_type"],
-                "effect_value": loc["effect_value"],
-                "background_image": loc.get("background_image", ""),
-                "player_cards": [],
-                "opponent_cards": []
-            }
-            for loc in selected_locations
-        ]
+        selected_locations = self.rng.sample(range(len(LOCATIONS)), 3)
+        self.locations = [Location(location_id) for location_id in selected_locations]
+        self._reset_location_caches()
     
     def play_card(self, card_index, location_index, player, player_id=None):
         if self.game_over:
             return False, "Game is over"
         
+        before = self._state_signature() if self.track_changes else None
+        
         # Check if it's the player's turn (for multiplayer)
         if player_id and not self.is_player_turn(player_id):
             return False, "Not your turn"
@@ -109,97 +460,118 @@ class Game:
         if card_index >= len(hand):
             return False, "Invalid card index"
         
-        card = hand[card_index]
-        
-        # Calculate actual cost considering location effects
-        actual_cost = self.calculate_card_cost(card, location, player)
+        # Actual cost considering location effects, from the hand cost table
+        actual_cost = self.hand_costs(player)[card_index][location_index]
         
         if actual_cost > energy:
             return False, "Not enough energy"
         
         # Check if location is full (4 card limit)
-        player_cards_at_location = len(location["player_cards"]) if player == "player" else len(location["opponent_cards"])
-        if player_cards_at_location >= 4:
+        if len(location.cards(player)) >= 4:
             return False, "Location is full (maximum 4 cards)"
         
+        self._play_card(card_index, location_index, player, actual_cost)
+        
+        if before is not None:
+            self._record_changes(before)
+        self._log_action(f"{'P' if player == 'player' else 'O'}{card_index},{location_index}")
+        return True, "Card played successfully"
+    
+    def _play_card(self, card_index, location_index, player, actual_cost):
+        """Play a card from hand and apply its effects, without any checks"""
+        hand = self.player_hand if player == "player" else self.opponent_hand
+        location = self.locations[location_index]
+        card_id = hand[card_index]
+        
         # Play the card
+        location.add_card(player, card_id)
         if player == "player":
-            location["player_cards"].append(card)
             self.player_energy -= actual_cost
         else:
-            location["opponent_cards"].append(card)
             self.opponent_energy -= actual_cost
         
         # Remove card from hand
         hand.pop(card_index)
+        self.hand_costs(player).pop(card_index)
+        self._hand_hashes[player] = (self._hand_hashes[player] - HAND_KEYS[player][card_id]) & MASK
         
         # Apply location effects when card is played
         EffectHandler.apply_location_effect(location, player, self)
         
         # Handle immediate effects (like destroy) right away
-        if card.get("ability_type") == "on_reveal" and card.get("ability_effect"):
-            effect = card["ability_effect"]
-            if effect["type"] == "destroy_card" or effect["type"] == "increase_hand_costs":
-                # These effects happen immediately
-                EffectHandler.apply_card_ability(card, location, player, self)
-            elif effect["type"] != "reduce_opponent_power":  # Power reductions are now ongoing
+        effects = CARD_EFFECTS[card_id]
+        if effects.on_reveal:
+            if effects.on_reveal_immediate:
+                EffectHandler.apply_card_ability(card_id, location, player, self)
+            else:
                 # Other on_reveal effects are processed at turn end
-                self.pending_on_reveal_effects.append({
-                    "card": card,
-                    "location_index": location_index,
-                    "player": player
-                })
-        
-        return True, "Card played successfully"
+                self.pending_on_reveal_effects.append((card_id, location_index, player))
     
-    def calculate_card_cost(self, card, location, player="player"):
+    def calculate_card_cost(self, card_id, location, player="player"):
         """Calculate the actual cost of a card considering location effects and hand cost increases"""
-        base_cost = card["cost"]
-        cost_modifier = EffectHandler.calculate_card_cost_modifier(card, location)
-        
-        # Apply global cost reductions from all locations
-        global_cost_reduction = 0
-        for loc in self.locations:
-            if loc.get("effect_type") == "cost_reduction":
-                global_cost_reduction += loc["effect_value"]
+        base_cost = CARDS_BY_ID[card_id]["cost"]
+        cost_modifier = EffectHandler.calculate_card_cost_modifier(card_id, location)
         
         # Apply hand cost increases
         hand_cost_increase = self.player_hand_cost_increase if player == "player" else self.opponent_hand_cost_increase
         
-        total_cost = max(0, base_cost + cost_modifier + hand_cost_increase - global_cost_reduction)
+        total_cost = max(0, base_cost + cost_modifier + hand_cost_increase + self._global_cost_modifier)
         return total_cost
     
+    def hand_costs(self, player):
+        """Get the cost of each card in a side's hand at each location, as one row per hand card.
+        
+        The table is kept between calls: drawing or playing a card adds or removes its row,
+        and the whole table is only rebuilt when the locations or the side's hand cost
+        increase change. Callers must not modify it.
+        """
+        hand_cost_increase = self.player_hand_cost_increase if player == "player" else self.opponent_hand_cost_increase
+        cached = self._hand_costs[player]
+        if cached is not None and cached[0] == hand_cost_increase:
+            return cached[1]
+        
+        hand = self.player_hand if player == "player" else self.opponent_hand
+        rows = [self._card_cost_row(card_id, hand_cost_increase) for card_id in hand]
+        self._hand_costs[player] = (hand_cost_increase, rows)
+        return rows
+    
+    def _card_cost_row(self, card_id, hand_cost_increase):
+        """Get a card's cost at each location"""
+        base_cost = CARDS_BY_ID[card_id]["cost"] + hand_cost_increase
+        return [max(0, base_cost + modifier) for modifier in self._location_cost_modifiers]
+    
+    def _reset_location_caches(self):
+        """Recalculate location cost modifiers and hash and drop the hand cost tables after the locations change"""
+        self._locations_hash = mix64(sum(location.location_id << (8 * i) for i, location in enumerate(self.locations)) + 1)
+        self._global_cost_modifier = sum(location.effects.global_cost for location in self.locations)
+        self._location_cost_modifiers = [location.effects.cost + self._global_cost_modifier
+                                         for location in self.locations]
+        self._hand_costs = {"player": None, "opponent": None}  # player -> (hand cost increase, rows) or None
+    
     def apply_location_effects(self, location_index, player):
         """Apply location effects when a card is played"""
         location = self.locations[location_index]
         EffectHandler.apply_location_effect(location, player, self)
     
-    def process_on_reveal_ability(self, card, location_index, player):
+    def process_on_reveal_ability(self, card_id, location_index, player):
         """Process On Reveal abilities when a card is played"""
         location = self.locations[location_index]
-        EffectHandler.apply_card_ability(card, location, player, self)
+        EffectHandler.apply_card_ability(card_id, location, player, self)
     
     def calculate_location_power(self, location, player):
         """Calculate total power for a player at a location, including Ongoing abilities and location effects"""
-        cards = location["player_cards"] if player == "player" else location["opponent_cards"]
-        opponent_cards = location["opponent_cards"] if player == "player" else location["player_cards"]
-        total_power = 0
-        
-        for card in cards:
-            base_power = card["power"]
-            power_modifier = EffectHandler.calculate_card_power_modifier(card, location, cards, opponent_cards)
-            total_power += base_power + power_modifier
-        
-        return total_power
+        return location.total_power(player)
     
-    def calculate_card_power(self, card, location, player):
+    def calculate_card_power(self, card_id, location, player):
         """Calculate the modified power of a single card, including Ongoing effects and location effects"""
-        base_power = card["power"]
-        cards = location["player_cards"] if player == "player" else location["opponent_cards"]
-        opponent_cards = location["opponent_cards"] if player == "player" else location["player_cards"]
-        power_modifier = EffectHandler.calculate_card_power_modifier(card, location, cards, opponent_cards)
+        cards = location.cards(player)
+        if card_id in cards:
+            # Equal cards get equal modifiers, so the first copy's cached power is the right one
+            return location.card_powers(player)[cards.index(card_id)]
+        base_power = CARDS_BY_ID[card_id]["power"]
+        power_modifier = EffectHandler.calculate_card_power_modifier(card_id, location, player)
         return base_power + power_modifier
-
+    
     def end_turn(self, player_id=None):
         # In single player mode, we're more permissive about turn ending
         # Only check turn if a specific player_id is provided
@@ -209,9 +581,18 @@ class Game:
             elif player_id == "opponent" and self.is_player_turn():
                 return False, "Not your turn"
         
+        before = self._state_signature() if self.track_changes else None
+        self._end_turn()
+        if before is not None:
+            self._record_changes(before)
+        self._log_action("E")
+        return True, "Turn ended successfully"
+    
+    def _end_turn(self):
+        """Resolve end of turn effects and pass the turn, without any checks"""
         # Process all pending On Reveal effects
-        for effect in self.pending_on_reveal_effects:
-            self.process_on_reveal_ability(effect["card"], effect["location_index"], effect["player"])
+        for card_id, location_index, player in self.pending_on_reveal_effects:
+            self.process_on_reveal_ability(card_id, location_index, player)
         self.pending_on_reveal_effects.clear()
         
         # Process all pending location draw effects
@@ -241,8 +622,113 @@ class Game:
             else:
                 self.game_over = True
                 self.calculate_winner()
+    
+    def legal_moves(self, player=None):
+        """Get a list of every (card_index, location_index) play a side can afford right now.
         
-        return True, "Turn ended successfully"
+        Respects energy, cost modifiers and the 4 card limit. Defaults to the side to
+        move; END_TURN is always legal for that side and isn't included.
+        """
+        if self.game_over:
+            return []
+        player = player or self.current_player
+        energy = self.player_energy if player == "player" else self.opponent_energy
+        hand_costs = self.hand_costs(player)
+        # Full locations (4 card limit) are skipped
+        return [
+            (card_index, location_index)
+            for location_index, location in enumerate(self.locations) if len(location.cards(player)) < 4
+            for card_index, costs in enumerate(hand_costs) if costs[location_index] <= energy
+        ]
+    
+    def apply(self, move, undoable=True):
+        """Make a move for the side to move so that undo() can take it back.
+        
+        move is a play from legal_moves() or END_TURN. Unlike play_card() and end_turn()
+        nothing is checked and the state version and action log are left alone, so this
+        is only for trying moves during search. Moves are undone newest first; playouts
+        on a fork() that never undo can pass undoable=False to skip the bookkeeping.
+        """
+        player = self.current_player
+        if undoable:
+            self._undo_stack.append(self._undo_record(move, player))
+        
+        if move == END_TURN:
+            self._end_turn()
+        else:
+            card_index, location_index = move
+            self._play_card(card_index, location_index, player, self.hand_costs(player)[card_index][location_index])
+    
+    def _undo_record(self, move, player):
+        """Save what a move can change, for undo()"""
+        if move == END_TURN:
+            card_id = None
+            # Pending On Reveal effects may change any location
+            resolves_effects = bool(self.pending_on_reveal_effects)
+        else:
+            card_id = (self.player_hand if player == "player" else self.opponent_hand)[move[0]]
+            resolves_effects = CARD_EFFECTS[card_id].on_reveal_immediate
+        
+        return (
+            move, player, card_id,
+            tuple([getattr(self, name) for name in self._UNDO_FIELDS]),
+            self.rng.getstate(),
+            self.pending_on_reveal_effects.copy(),
+            self.pending_location_draw_effects.copy(),
+            len(self.player_hand), len(self.opponent_hand),
+            [(location.player_cards.copy(), location.opponent_cards.copy()) for location in self.locations]
+            if resolves_effects else None,
+        )
+    
+    def undo(self, move):
+        """Take back the last move made with apply()"""
+        if not self._undo_stack or self._undo_stack[-1][0] != move:
+            raise ValueError(f"{move!r} is not the last applied move")
+        (_, player, card_id, fields, rng_state, pending_on_reveal_effects, pending_location_draw_effects,
+         player_hand_size, opponent_hand_size, location_cards) = self._undo_stack.pop()
+        
+        for name, value in zip(self._UNDO_FIELDS, fields):
+            setattr(self, name, value)
+        self.rng.setstate(rng_state)
+        self.pending_on_reveal_effects = pending_on_reveal_effects
+        self.pending_location_draw_effects = pending_location_draw_effects
+        
+        # Put drawn cards back on their decks
+        if move != END_TURN:
+            player_hand_size -= player == "player"
+            opponent_hand_size -= player == "opponent"
+        self._return_drawn_cards("player", player_hand_size)
+        self._return_drawn_cards("opponent", opponent_hand_size)
+        
+        if location_cards is not None:
+            for location, (player_cards, opponent_cards) in zip(self.locations, location_cards):
+                if location.player_cards != player_cards or location.opponent_cards != opponent_cards:
+                    location.player_cards[:] = player_cards
+                    location.opponent_cards[:] = opponent_cards
+                    location.invalidate()
+        
+        if move != END_TURN:
+            card_index, location_index = move
+            if location_cards is None:
+                # Otherwise the played card went with the restored location lists
+                self.locations[location_index].remove_card(player, -1)
+            (self.player_hand if player == "player" else self.opponent_hand).insert(card_index, card_id)
+            self._hand_hashes[player] = (self._hand_hashes[player] + HAND_KEYS[player][card_id]) & MASK
+            cached = self._hand_costs[player]
+            if cached is not None:
+                cached[1].insert(card_index, self._card_cost_row(card_id, cached[0]))
+    
+    def _return_drawn_cards(self, player, hand_size):
+        """Move cards drawn after the hand had hand_size cards back onto the deck"""
+        hand = self.player_hand if player == "player" else self.opponent_hand
+        deck = self.player_deck if player == "player" else self.opponent_deck
+        cached = self._hand_costs[player]
+        while len(hand) > hand_size:
+            card_id = hand.pop()
+            deck.append(card_id)
+            self._hand_hashes[player] = (self._hand_hashes[player] - HAND_KEYS[player][card_id]) & MASK
+            if cached is not None:
+                cached[1].pop()
     
     def calculate_winner(self):
         player_score = 0
@@ -262,60 +748,135 @@ class Game:
         elif opponent_score > player_score:
             self.winner = "opponent"
         else:
-            self.winner = "tie" 
-
+            self.winner = "tie"
+    
+    def _log_action(self, action):
+        """Record a successful action in compact form: "P<card>,<location>" / "O<card>,<location>" plays, "E" end turn"""
+        self.action_count += 1
+        self.new_actions.append(action)
+    
+    def apply_action(self, action):
+        """Apply an action recorded by _log_action"""
+        if action == "E":
+            return self.end_turn()
+        card_index, location_index = action[1:].split(",")
+        player = "player" if action[0] == "P" else "opponent"
+        return self.play_card(int(card_index), int(location_index), player)
+    
+    @classmethod
+    def replay(cls, seed, player_deck_ids, actions):
+        """Rebuild a game from its seed, deck and the actions taken so far"""
+        game = cls(player_deck_ids=player_deck_ids, seed=seed)
+        for action in actions:
+            game.apply_action(action)
+        game.new_actions.clear()
+        return game
+    
+    def _state_signature(self):
+        """Get the raw values behind each part of the client state, in _STATE_PARTS order then locations"""
+        signature = [getattr(self, name) for name in self._SIMPLE_STATE_FIELDS]
+        # Hand costs depend on the hand cost increase, so it is part of the hand's signature
+        signature.append((tuple(self.player_hand), self.player_hand_cost_increase))
+        signature.append(tuple(self.opponent_hand))
+        for location in self.locations:
+            signature.append((tuple(location.player_cards), tuple(location.opponent_cards)))
+        return signature
+    
+    def _record_changes(self, before):
+        """Bump the state version and log which parts of the state differ from before"""
+        after = self._state_signature()
+        changed = 0
+        for bit, (old, new) in enumerate(zip(before, after)):
+            if old != new:
+                changed |= 1 << bit
+        if not changed:
+            return
+        self.state_version += 1
+        self.change_log.append((self.state_version, changed))
+        if len(self.change_log) > self.CHANGE_LOG_SIZE:
+            del self.change_log[0]
+    
+    def _location_state(self, location):
+        """Get one location with its cards' modified power and each side's total power"""
+        # Modified power for each card comes from the location's power cache
+        player_cards_with_power = []
+        for card_id, modified_power in zip(location.player_cards, location.card_powers("player")):
+            card_data = CARDS_BY_ID[card_id].copy()
+            card_data["modified_power"] = modified_power
+            player_cards_with_power.append(card_data)
+        
+        opponent_cards_with_power = []
+        for card_id, modified_power in zip(location.opponent_cards, location.card_powers("opponent")):
+            card_data = CARDS_BY_ID[card_id].copy()
+            card_data["modified_power"] = modified_power
+            opponent_cards_with_power.append(card_data)
+        
+        # For single player mode, player always sees their cards as player_cards
+        location_data = location.to_dict()
+        location_data["player_cards"] = player_cards_with_power
+        location_data["opponent_cards"] = opponent_cards_with_power
+        location_data["player_power"] = location.total_power("player")
+        location_data["opponent_power"] = location.total_power("opponent")
+        return location_data
+    
+    def _player_hand_state(self):
+        """Get the player's hand with each card's cost at every location"""
+        my_hand_with_costs = []
+        for card_id, costs in zip(self.player_hand, self.hand_costs("player")):
+            card_data = CARDS_BY_ID[card_id].copy()
+            card_data["location_costs"] = dict(enumerate(costs))
+            my_hand_with_costs.append(card_data)
+        return my_hand_with_costs
+    
+    def get_state_delta(self, since_version, game_id=None):
+        """Get only the parts of the game state that changed after since_version.
+        
+        Returns None when the change log can't cover since_version (or it belongs
+        to another game), in which case the caller should send get_game_state().
+        """
+        if game_id is not None and game_id != self.game_id:
+            return None
+        if since_version == self.state_version:
+            changed = 0
+        elif (since_version is None or since_version > self.state_version or not self.change_log
+              or since_version < self.change_log[0][0] - 1):
+            return None
+        else:
+            changed = 0
+            for version, parts in self.change_log:
+                if version > since_version:
+                    changed |= parts
+        
+        bits = self._PART_BITS
+        fields = {}
+        for name in self._SIMPLE_STATE_FIELDS:
+            if changed & bits[name]:
+                fields[name] = getattr(self, name)
+        if changed & bits["current_player"]:
+            fields["is_my_turn"] = self.is_player_turn()
+        if changed & bits["player_hand"]:
+            fields["player_hand"] = self._player_hand_state()
+        if changed & bits["opponent_hand"]:
+            fields["opponent_hand"] = [CARDS_BY_ID[card_id] for card_id in self.opponent_hand]
+        location_bit = len(self._STATE_PARTS)
+        
+        return {
+            "game_id": self.game_id,
+            "state_version": self.state_version,
+            "fields": fields,
+            "locations": {
+                i: self._location_state(location)
+                for i, location in enumerate(self.locations) if changed & (1 << (location_bit + i))
+            }
+        }
+    
     def get_game_state(self, player_id=None):
         """Get the current game state with calculated power for each location"""
-        locations_with_power = []
-        for location in self.locations:
-            player_power = self.calculate_location_power(location, "player")
-            opponent_power = self.calculate_location_power(location, "opponent")
-            
-            # Calculate modified power for each card
-            player_cards_with_power = []
-            for card in location["player_cards"]:
-                card_data = card.copy()
-                card_data["modified_power"] = self.calculate_card_power(card, location, "player")
-                player_cards_with_power.append(card_data)
-            
-            opponent_cards_with_power = []
-            for card in location["opponent_cards"]:
-                card_data = card.copy()
-                card_data["modified_power"] = self.calculate_card_power(card, location, "opponent")
-                opponent_cards_with_power.append(card_data)
-            
-            # For single player mode, player always sees their cards as player_cards
-            my_cards = player_cards_with_power
-            opponent_cards = opponent_cards_with_power
-            my_power = player_power
-            opponent_power = opponent_power
-            
-            location_data = location.copy()
-            location_data["player_cards"] = my_cards
-            location_data["opponent_cards"] = opponent_cards
-            location_data["player_power"] = my_power
-            location_data["opponent_power"] = opponent_power
-            locations_with_power.append(location_data)
+        locations_with_power = [self._location_state(location) for location in self.locations]
         
         # For single player mode, player always sees their own hand and energy
-        my_hand = self.player_hand
-        my_energy = self.player_energy
-        my_unused_energy = self.player_unused_energy
-        my_hand_cost_increase = self.player_hand_cost_increase
-        opponent_hand = self.opponent_hand
-        opponent_energy = self.opponent_energy
-        opponent_unused_energy = self.opponent_unused_energy
-        opponent_hand_cost_increase = self.opponent_hand_cost_increase
-        
-        # Calculate modified costs for cards in hand
-        my_hand_with_costs = []
-        for card in my_hand:
-            card_data = card.copy()
-            # Calculate costs for each location
-            card_data["location_costs"] = {}
-            for i, location in enumerate(self.locations):
-                card_data["location_costs"][i] = self.calculate_card_cost(card, location, "player")
-            my_hand_with_costs.append(card_data)
+        my_hand_with_costs = self._player_hand_state()
+        opponent_hand = [CARDS_BY_ID[card_id] for card_id in self.opponent_hand]
         
         game_state = {
             "turn": self.turn,
@@ -323,16 +884,19 @@ class Game:
             "current_player": self.current_player,
             "player_hand": my_hand_with_costs,
             "opponent_hand": opponent_hand,
-            "player_energy": my_energy,
-            "opponent_energy": opponent_energy,
-            "player_unused_energy": my_unused_energy,
-            "opponent_unused_energy": opponent_unused_energy,
+            "player_energy": self.player_energy,
+            "opponent_energy": self.opponent_energy,
+            "player_unused_energy": self.player_unused_energy,
+            "opponent_unused_energy": self.opponent_unused_energy,
             "locations": locations_with_power,
             "game_over": self.game_over,
             "winner": self.winner,
-            "player_hand_cost_increase": my_hand_cost_increase,
-            "opponent_hand_cost_increase": opponent_hand_cost_increase,
-            "is_my_turn": self.is_player_turn()
+            "player_hand_cost_increase": self.player_hand_cost_increase,
+            "opponent_hand_cost_increase": self.opponent_hand_cost_increase,
+            "is_my_turn": self.is_player_turn(),
+            "game_id": self.game_id,
+            "state_version": self.state_version,
+            "seed": self.seed
         }
         
-        return game_state 
\ No newline at end of file
+        return game_state
\ No newline at end of file
@@ -0,0 +1,283 @@
+# Game Cache - Live games kept in memory between requests, optionally written to the database behind
+# Requests get a copy of the user's cached game instead of loading and decoding it from the
+# database.
+#
+# By default several workers may serve the same user, so every change is saved as it is
+# put() and, before a cached game is used, the saved game's seed and version (its saved
+# action count) are checked against the database with one small query; if another worker
+# has moved the game on, the cached copy is dropped and the game is loaded again. Saves
+# compare and swap the version, so when two workers change the same game only the first
+# save succeeds; the other's put() returns False and its copy is dropped.
+#
+# A cache created with exclusive=True is the only one serving its users (a single worker,
+# or sticky routing). It then trusts its cached games without the version query and can
+# save behind: with a flush_interval above 0, changes are saved at game over, when games
+# are evicted, every flush interval and at shutdown. Write-behind is refused otherwise,
+# since another worker would load the older row and never see the unsaved moves.
+#
+# The cache lock only guards the in-memory table; database reads and writes happen outside
+# it, so one slow save doesn't hold up other users' requests. Each entry has its own save
+# lock, which keeps a game's version check, saves and merges in order.
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+class _CachedGame:
+    """A cached game and its bookkeeping"""
+    __slots__ = ("game", "size", "last_used", "dirty_since", "save_lock")
+    
+    def __init__(self, game):
+        self.game = game
+        self.size = _game_size(game)
+        self.last_used = time.monotonic()
+        self.dirty_since = self.last_used if game.new_actions else None  # When unsaved actions first appeared
+        self.save_lock = threading.Lock()  # Held while the game is checked against or saved to the database
+    
+    def saved_action_count(self):
+        """Get the number of the game's actions already in the database"""
+        return self.game.action_count - len(self.game.new_actions)
+
+
+def _game_size(game):
+    """Estimate the memory a game uses in bytes"""
+    size = sys.getsizeof(game) + sys.getsizeof(game.__dict__)
+    for value in game.__dict__.values():
+        if isinstance(value, (list, dict, tuple)):
+            size += sys.getsizeof(value)
+    for location in game.locations:
+        size += sys.getsizeof(location) + sys.getsizeof(location.player_cards) + sys.getsizeof(location.opponent_cards)
+    return size
+
+
+class GameCache:
+    """LRU cache of live games by user id with idle expiry, a memory cap and write-behind saving.
+    
+    load(user_id), save(user_id, game) and saved_version(user_id) -> (seed, saved actions)
+    or None are the database functions; app_context makes the context they need when the
+    cache saves from its background thread or at shutdown. A flush_interval of 0 saves
+    every put() right away; anything else needs exclusive=True.
+    """
+    
+    # Shortest pause between background sweeps, in seconds
+    MIN_SWEEP_INTERVAL = 0.5
+    
+    def __init__(self, load, save, saved_version, app_context, max_games=1000, max_bytes=64 * 1024 * 1024,
+                 idle_ttl=600, flush_interval=0, exclusive=False):
+        if flush_interval > 0 and not exclusive:
+            raise ValueError("Write-behind (flush_interval > 0) is only safe for an exclusive cache")
+        self.load = load
+        self.save = save
+        self.saved_version = saved_version
+        self.app_context = app_context
+        self.max_games = max_games
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.flush_interval = flush_interval
+        self.exclusive = exclusive  # True when no other process changes these users' games
+        self._games = OrderedDict()  # user_id -> _CachedGame, least recently used first
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._flusher = None
+        self._closed = False
+        self.hits = 0
+        self.misses = 0
+        self.conflicts = 0
+    
+    def get(self, user_id):
+        """Get a copy of the user's game to change and put() back, or None if there is none"""
+        with self._lock:
+            entry = self._games.get(user_id)
+        if entry is not None:
+            with entry.save_lock:
+                # An exclusive cache's games can't have been changed elsewhere
+                saved_version = None if self.exclusive else self.saved_version(user_id)
+                with self._lock:
+                    if self._games.get(user_id) is entry:
+                        if self.exclusive or saved_version == (entry.game.seed, entry.saved_action_count()):
+                            self.hits += 1
+                            entry.last_used = time.monotonic()
+                            self._games.move_to_end(user_id)
+                            return entry.game.fork()
+                        # Another worker saved this game since it was cached; its version wins
+                        self.conflicts += 1
+                        self._remove(user_id)
+        
+        game = self.load(user_id)
+        with self._lock:
+            self.misses += 1
+            entry = self._games.get(user_id)
+            if entry is not None:
+                # Another request cached the game while this one was loading it
+                return entry.game.fork()
+            if game is None:
+                return None
+            self._add(user_id, game)
+        self._evict()
+        return game.fork()
+    
+    def put(self, user_id, game):
+        """Store a changed game; saves now only when the game is new or over. Returns False on a conflict."""
+        with self._lock:
+            old_entry = self._games.get(user_id)
+        saved_action_count = game.action_count - len(game.new_actions)
+        if old_entry is not None and old_entry.game.seed != game.seed and saved_action_count > 0:
+            # The copy is of a game that has since been replaced
+            with self._lock:
+                self.conflicts += 1
+            return False
+        
+        if old_entry is not None and old_entry.game.seed == game.seed:
+            # A save's compare and swap catches another worker's change, so nothing is read here
+            with old_entry.save_lock:
+                with self._lock:
+                    if self._games.get(user_id) is not old_entry or saved_action_count != old_entry.game.action_count:
+                        # The copy was taken before another request changed the game
+                        self.conflicts += 1
+                        return False
+                    game.new_actions[:0] = old_entry.game.new_actions
+                    self._remove(user_id)
+                    entry = self._add(user_id, game)
+                    if old_entry.dirty_since is not None:
+                        entry.dirty_since = old_entry.dirty_since
+                    save_now = game.game_over or self.flush_interval <= 0
+                    if save_now:
+                        # Taken before anyone else can see the entry, so the save below goes first
+                        entry.save_lock.acquire()
+        else:
+            # Games the cache didn't have (such as new ones) are saved right away so that their row exists
+            entry = _CachedGame(game)
+            entry.save_lock.acquire()
+            with self._lock:
+                if user_id in self._games:
+                    self._remove(user_id)
+                self._add_entry(user_id, entry)
+            save_now = True
+        
+        if save_now:
+            try:
+                saved = self._save_entry(user_id, entry)
+            finally:
+                entry.save_lock.release()
+        else:
+            saved = True
+        self._evict()
+        return saved
+    
+    def discard(self, user_id):
+        """Drop the user's game without saving it (when it is deleted)"""
+        with self._lock:
+            if user_id in self._games:
+                self._remove(user_id)
+    
+    def flush(self, user_id=None):
+        """Save the user's unsaved actions, or every user's when user_id is None"""
+        with self._lock:
+            if user_id is not None:
+                entries = [(user_id, self._games[user_id])] if user_id in self._games else []
+            else:
+                entries = list(self._games.items())
+        for uid, entry in entries:
+            self._flush_entry(uid, entry)
+    
+    def close(self):
+        """Save everything and stop the background flusher (call at shutdown)"""
+        self._closed = True
+        with self.app_context():
+            self.flush()
+    
+    def stats(self):
+        """Get the counters as a dict"""
+        with self._lock:
+            return {
+                "games": len(self._games),
+                "bytes": self._bytes,
+                "dirty": sum(1 for entry in self._games.values() if entry.dirty_since is not None),
+                "hits": self.hits,
+                "misses": self.misses,
+                "conflicts": self.conflicts,
+            }
+    
+    def _add(self, user_id, game):
+        entry = _CachedGame(game)
+        self._add_entry(user_id, entry)
+        return entry
+    
+    def _add_entry(self, user_id, entry):
+        self._games[user_id] = entry
+        self._bytes += entry.size
+        # Idle games are expired by the background thread, so it runs whenever anything is cached
+        self._start_flusher()
+    
+    def _remove(self, user_id):
+        entry = self._games.pop(user_id)
+        self._bytes -= entry.size
+        return entry
+    
+    def _save_entry(self, user_id, entry):
+        """Save an entry's game (hold its save lock); on failure the database's copy wins and the entry is dropped"""
+        if self.save(user_id, entry.game):
+            entry.dirty_since = None
+            return True
+        with self._lock:
+            self.conflicts += 1
+            if self._games.get(user_id) is entry:
+                self._remove(user_id)
+        return False
+    
+    def _flush_entry(self, user_id, entry):
+        """Save an entry's unsaved actions, if it still has any"""
+        with entry.save_lock:
+            if entry.game.new_actions:
+                self._save_entry(user_id, entry)
+    
+    def _drop_entry(self, user_id, entry):
+        """Save an entry's unsaved actions and drop it from the cache"""
+        with entry.save_lock:
+            if entry.game.new_actions:
+                self._save_entry(user_id, entry)
+            with self._lock:
+                if self._games.get(user_id) is entry:
+                    self._remove(user_id)
+    
+    def _evict(self):
+        """Save and drop least recently used games while over the game count or memory cap"""
+        while True:
+            with self._lock:
+                if not self._games or (len(self._games) <= self.max_games and self._bytes <= self.max_bytes):
+                    return
+                user_id, entry = next(iter(self._games.items()))
+            self._drop_entry(user_id, entry)
+    
+    def _flush_due(self):
+        """Save games that have had unsaved actions for a flush interval and drop idle ones"""
+        now = time.monotonic()
+        with self._lock:
+            entries = list(self._games.items())
+        for user_id, entry in entries:
+            if now - entry.last_used >= self.idle_ttl:
+                self._drop_entry(user_id, entry)
+            elif entry.dirty_since is not None and now - entry.dirty_since >= self.flush_interval:
+                self._flush_entry(user_id, entry)
+    
+    def _sweep_interval(self):
+        """Get the pause between background sweeps: half the flush interval or idle TTL, whichever is shorter"""
+        interval = min(self.flush_interval, self.idle_ttl) if self.flush_interval > 0 else self.idle_ttl
+        return max(interval / 2, self.MIN_SWEEP_INTERVAL)
+    
+    def _start_flusher(self):
+        """Start the background flush thread in this process, once (after any fork)"""
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._run_flusher, name="game-cache-flusher", daemon=True)
+            self._flusher.start()
+    
+    def _run_flusher(self):
+        while not self._closed:
+            time.sleep(self._sweep_interval())
+            try:
+                with self.app_context():
+                    self._flush_due()
+            except Exception as e:
+                print(f"Error flushing cached games: {e}")
@@ -0,0 +1,155 @@
+# Game Codec - Compact, versioned binary encoding of saved games
+# A saved game is a short header (magic bytes and a format version) followed by the
+# game's fields: small integers packed with struct and card lists as one byte per id.
+# Blobs never reference Game's class layout, so refactoring Game doesn't break games
+# already saved; readers for every older format version stay in _DECODERS.
+
+import base64
+import pickle
+import struct
+
+from game import Game, GameRandom
+
+MAGIC = b"GS"
+CODEC_VERSION = 1
+
+SIDES = ("player", "opponent")
+WINNERS = (None, "player", "opponent", "tie")
+NO_DECK = 0xFF  # List length meaning None (player_deck_ids of a game created without a deck)
+
+_HEADER = struct.Struct("<2sB")
+# Version 1: turn, max_turns, flags, winner, energies, unused energies and hand cost
+# increases (signed bytes), game_id, state_version, seed, RNG state, action_count.
+# Then one byte per value: the hands, decks and player_deck_ids as length-prefixed
+# card lists, each location's id and card lists, pending effects, and the change log
+# as (versions before state_version, changed parts low byte, high byte).
+_FIXED_V1 = struct.Struct("<BBBB6bIHQQH")
+
+_OPPONENT_TO_MOVE = 1  # Flag bits
+_GAME_OVER = 2
+
+
+def _add_ids(out, ids):
+    """Add a length byte and one byte per card id"""
+    if ids is None:
+        out.append(NO_DECK)
+    else:
+        out.append(len(ids))
+        out.extend(ids)
+
+
+def encode_game(game):
+    """Encode a game as bytes in the current format"""
+    flags = (_OPPONENT_TO_MOVE if game.current_player == "opponent" else 0) | (_GAME_OVER if game.game_over else 0)
+    fixed = _FIXED_V1.pack(
+        game.turn, game.max_turns, flags, WINNERS.index(game.winner),
+        game.player_energy, game.opponent_energy, game.player_unused_energy, game.opponent_unused_energy,
+        game.player_hand_cost_increase, game.opponent_hand_cost_increase,
+        game.game_id, game.state_version, game.seed, game.rng.getstate(), game.action_count,
+    )
+    out = []
+    _add_ids(out, game.player_hand)
+    _add_ids(out, game.opponent_hand)
+    _add_ids(out, game.player_deck)
+    _add_ids(out, game.opponent_deck)
+    _add_ids(out, game.player_deck_ids)
+    out.append(len(game.locations))
+    for location in game.locations:
+        out.append(location.location_id)
+        _add_ids(out, location.player_cards)
+        _add_ids(out, location.opponent_cards)
+    out.append(len(game.pending_on_reveal_effects))
+    for card_id, location_index, player in game.pending_on_reveal_effects:
+        out += (card_id, location_index, SIDES.index(player))
+    out.append(len(game.pending_location_draw_effects))
+    for player, count in game.pending_location_draw_effects:
+        out += (SIDES.index(player), count)
+    out.append(len(game.change_log))
+    for version, changed in game.change_log:
+        out += (game.state_version - version, changed & 0xFF, changed >> 8)
+    # bytes() raises ValueError for anything that doesn't fit the format
+    return _HEADER.pack(MAGIC, CODEC_VERSION) + fixed + bytes(out)
+
+
+def _decode_v1(blob, offset):
+    """Read a version 1 blob into a Game state tuple (see Game._STATE_FIELDS)"""
+    (turn, max_turns, flags, winner,
+     player_energy, opponent_energy, player_unused_energy, opponent_unused_energy,
+     player_hand_cost_increase, opponent_hand_cost_increase,
+     game_id, state_version, seed, rng_state, action_count) = _FIXED_V1.unpack_from(blob, offset)
+    offset += _FIXED_V1.size
+    
+    card_lists = []
+    for _ in range(5):
+        length = blob[offset]
+        if length == NO_DECK:
+            card_lists.append(None)
+            offset += 1
+        else:
+            card_lists.append(list(blob[offset + 1:offset + 1 + length]))
+            offset += 1 + length
+    player_hand, opponent_hand, player_deck, opponent_deck, player_deck_ids = card_lists
+    
+    locations = []
+    count, offset = blob[offset], offset + 1
+    for _ in range(count):
+        location_id = blob[offset]
+        length = blob[offset + 1]
+        player_cards = list(blob[offset + 2:offset + 2 + length])
+        offset += 2 + length
+        length = blob[offset]
+        opponent_cards = list(blob[offset + 1:offset + 1 + length])
+        offset += 1 + length
+        locations.append((location_id, player_cards, opponent_cards))
+    
+    pending_on_reveal_effects = []
+    count, offset = blob[offset], offset + 1
+    for _ in range(count):
+        pending_on_reveal_effects.append((blob[offset], blob[offset + 1], SIDES[blob[offset + 2]]))
+        offset += 3
+    pending_location_draw_effects = []
+    count, offset = blob[offset], offset + 1
+    for _ in range(count):
+        pending_location_draw_effects.append((SIDES[blob[offset]], blob[offset + 1]))
+        offset += 2
+    change_log = []
+    count, offset = blob[offset], offset + 1
+    for _ in range(count):
+        change_log.append((state_version - blob[offset], blob[offset + 1] | blob[offset + 2] << 8))
+        offset += 3
+    
+    return (
+        turn, max_turns, "opponent" if flags & _OPPONENT_TO_MOVE else "player",
+        player_hand, opponent_hand, player_deck, opponent_deck, locations,
+        player_energy, opponent_energy, player_unused_energy, opponent_unused_energy,
+        bool(flags & _GAME_OVER), WINNERS[winner], pending_on_reveal_effects, pending_location_draw_effects,
+        player_hand_cost_increase, opponent_hand_cost_increase,
+        game_id, state_version, change_log,
+        seed, GameRandom(rng_state), action_count, player_deck_ids,
+    )
+
+
+# Readers for every format version that may still be stored
+_DECODERS = {
+    1: _decode_v1,
+}
+
+
+def decode_game(blob):
+    """Decode a game written by encode_game in any supported format version"""
+    magic, version = _HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError("Not an encoded game")
+    if version not in _DECODERS:
+        raise ValueError(f"Unsupported saved game format version {version}")
+    game = Game.__new__(Game)
+    game.__setstate__(_DECODERS[version](blob, _HEADER.size))
+    return game
+
+
+def decode_legacy_snapshot(game_data):
+    """Decode a snapshot saved before the binary format, as base64 of a pickled Game.
+    
+    Games pickled before cards were stored as ids are converted by Game.__setstate__.
+    """
+    return pickle.loads(base64.b64decode(game_data.encode("utf-8")))
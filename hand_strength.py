@@ -0,0 +1,113 @@
+# Hand Strength - Estimated win rates for a deck, simulated off the request thread
+# A request only ever submits simulations to a small process pool or reads finished results,
+# so web workers never wait on a simulation. Results are cached by the deck's sorted card ids.
+
+import math
+import multiprocessing
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from simulator import SimulationStats, run_batch
+
+HAND_STRENGTH_GAMES = 4000  # Games simulated per deck
+BATCH_SIZE = 500            # Games per pool task, so one deck can use several workers
+POLICY = "greedy"           # Policy both sides play with (see simulator.POLICIES)
+Z_95 = 1.96                 # z-score for 95% confidence intervals
+
+
+def wilson_interval(successes, trials, z=Z_95):
+    """Get the Wilson score confidence interval (low, high) for a rate"""
+    if trials == 0:
+        return 0.0, 1.0
+    rate = successes / trials
+    denominator = 1 + z * z / trials
+    centre = (rate + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(rate * (1 - rate) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+class HandStrengthEstimator:
+    """Runs deck simulations in a bounded process pool and caches the results.
+    
+    estimate() never blocks: it returns a cached result, or starts (or checks on)
+    the deck's simulations and reports them as pending.
+    """
+    
+    def __init__(self, workers=2, games=HAND_STRENGTH_GAMES, cache_size=256, max_pending=16):
+        self.workers = workers
+        self.games = games
+        self.cache_size = cache_size
+        self.max_pending = max_pending  # Decks that may be simulating at once
+        self._executor = None
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # sorted card ids -> result, least recently used first
+        self._running = {}           # sorted card ids -> futures for its batches
+    
+    def estimate(self, card_ids):
+        """Get (status, result) for a deck, where status is done, pending, busy (too many decks running) or failed"""
+        key = tuple(sorted(card_ids))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return "done", self._cache[key]
+            
+            futures = self._running.get(key)
+            if futures is None:
+                if len(self._running) >= self.max_pending:
+                    return "busy", None
+                futures = self._running[key] = self._submit(key)
+            if not all(future.done() for future in futures):
+                return "pending", None
+            
+            del self._running[key]
+            stats = SimulationStats()
+            try:
+                for future in futures:
+                    stats.merge(future.result())
+            except BrokenProcessPool:
+                # A worker died; start a new pool so the next request can try again
+                self._executor = None
+                return "failed", None
+            except Exception as e:
+                print(f"Error simulating hand {list(key)}: {e}")
+                return "failed", None
+            result = self._summarize(stats)
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return "done", result
+    
+    def _submit(self, key):
+        """Start simulating a deck in batches, seeded from its card ids so results are repeatable"""
+        if self._executor is None:
+            # Spawned workers don't inherit the web server's threads or open connections
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        seed = zlib.crc32(repr(key).encode())
+        futures = []
+        remaining = self.games
+        while remaining > 0:
+            count = min(BATCH_SIZE, remaining)
+            futures.append(self._executor.submit(run_batch, count, seed + len(futures), POLICY, POLICY, list(key)))
+            remaining -= count
+        return futures
+    
+    @staticmethod
+    def _summarize(stats):
+        """Get win/tie/loss rates with 95% confidence intervals for the player's deck"""
+        games = stats.games
+        result = {"games": games, "policy": POLICY}
+        for outcome, winner in (("win", "player"), ("tie", "tie"), ("loss", "opponent")):
+            count = stats.results[winner]
+            low, high = wilson_interval(count, games)
+            result[outcome] = {"rate": count / games if games else 0.0, "low": low, "high": high}
+        return result
+    
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
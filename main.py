@@ -1,33 +1,52 @@
 from flask import Flask, render_template, jsonify, request, session, redirect, url_for, flash
 from flask_bootstrap import Bootstrap
+import atexit
 import os
 import random
 import json
-import pickle
-import base64
 from datetime import datetime
-from game import Game, CHARACTERS
+from game import Game
+from card_registry import CARD_REGISTRY, card_ids_in_mask, card_mask, mask_has_card
 from flask_login import LoginManager, UserMixin, login_required, current_user, login_user, logout_user
 from sqlalchemy.orm import relationship, DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import Integer, String, Date, JSON, Boolean, DateTime, func
+from sqlalchemy import BigInteger, Integer, String, Date, JSON, Boolean, DateTime, LargeBinary, delete, func, inspect, insert, literal, select, text
+from sqlalchemy.dialects import postgresql, sqlite
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from xp_system import XPSystem
+from ai_system import AIPlayer, DIFFICULTY_LEVELS, MCTSPlayer
+from solver import solve_last_turn
+from hand_strength import HandStrengthEstimator
+from game_codec import decode_game, decode_legacy_snapshot, encode_game
+from game_cache import GameCache
 
 app = Flask(__name__)
 
+# Card ID -> name mapping for templates (built once, card data never changes at runtime)
+CARD_ID_TO_NAME = dict(CARD_REGISTRY.names)
+
 # Initialize Bootstrap
 bootstrap = Bootstrap(app)
 
 # Configuration
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key')
+# Opponent strength when the client doesn't ask for one: a key of DIFFICULTY_LEVELS, or "random"
+app.config['AI_DIFFICULTY'] = os.environ.get('AI_DIFFICULTY', 'medium')
+# Processes that simulate games for /api/hand-strength, per web worker
+app.config['HAND_STRENGTH_WORKERS'] = int(os.environ.get('HAND_STRENGTH_WORKERS', 2))
+hand_strength_estimator = HandStrengthEstimator(workers=app.config['HAND_STRENGTH_WORKERS'])
+# Seconds /api/final-turn-hint spends solving exactly before it falls back to a search
+app.config['HINT_TIME_BUDGET'] = float(os.environ.get('HINT_TIME_BUDGET', 0.1))
 
 login_manager = LoginManager()
 login_manager.init_app(app)
 
 @login_manager.user_loader
 def load_user(user_id):
-    return db.get_or_404(User, user_id)
+    user = db.get_or_404(User, user_id)
+    if not user.legacy_data_migrated:
+        migrate_legacy_user_data(user)
+    return user
 
 class Base(DeclarativeBase):
     pass
@@ -45,52 +64,340 @@ class User(UserMixin, db.Model):
     date_of_signup: Mapped[Date] = mapped_column(Date)
     xp: Mapped[int] = mapped_column(Integer, default=0)  # XP points
     last_daily_win: Mapped[Date] = mapped_column(Date, nullable=True)  # Track daily win bonus
-    misc1: Mapped[str] = mapped_column(String(100), nullable=True)
-    misc2: Mapped[str] = mapped_column(String(100), nullable=True)
+    misc1: Mapped[str] = mapped_column(String(100), nullable=True)  # Legacy saved hands JSON, moved to user_hands
+    misc2: Mapped[str] = mapped_column(String(100), nullable=True)  # Legacy current hand JSON, moved to user_hands
     misc3: Mapped[str] = mapped_column(String(100), nullable=True)
+    legacy_data_migrated: Mapped[bool] = mapped_column(Boolean, default=True)  # Cards and hands moved out of the JSON fields
+    unlocked_cards_mask: Mapped[int] = mapped_column(BigInteger, default=0)  # Unlocked card IDs as a card mask (see card_registry)
     
     # Relationship to collection
     collection = relationship("UserCollection", back_populates="user", uselist=False)
+    
+    @property
+    def unlocked_card_ids(self):
+        """Get the unlocked card IDs as a list, in order"""
+        return card_ids_in_mask(self.unlocked_cards_mask or 0)
 
-# Collection DB
+# Collection DB (legacy: unlocked cards are in user_cards; migrate_legacy_user_data moves them there)
 class UserCollection(db.Model):
     __tablename__ = "user_collections"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("users.id"))
-    unlocked_cards: Mapped[JSON] = mapped_column(JSON, default=list)  # List of card IDs
+    unlocked_cards: Mapped[JSON] = mapped_column(JSON, default=list)  # List of card IDs, null once migrated
     date_created: Mapped[DateTime] = mapped_column(DateTime, default=func.now())
     date_updated: Mapped[DateTime] = mapped_column(DateTime, default=func.now(), onupdate=func.now())
     
     # Relationship to user
     user = relationship("User", back_populates="collection")
 
+# Unlocked cards DB, one row per card a user has unlocked (the key is a (user_id, card_id) index).
+# Lookups use User.unlocked_cards_mask, which is updated with these rows.
+class UserCard(db.Model):
+    __tablename__ = "user_cards"
+    user_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("users.id"), primary_key=True)
+    card_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    date_unlocked: Mapped[DateTime] = mapped_column(DateTime, default=func.now())
+
+# Hands DB: each user's saved hands, oldest first, plus a copy of the hand they battle with
+class UserHand(db.Model):
+    __tablename__ = "user_hands"
+    __table_args__ = (db.Index("ix_user_hands_user_current", "user_id", "is_current", "id"),)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("users.id"))
+    is_current: Mapped[bool] = mapped_column(Boolean, default=False)  # The current battle hand, not a saved one
+    name: Mapped[str] = mapped_column(String(100))
+    cards: Mapped[bytes] = mapped_column(LargeBinary)  # One byte per card ID, as in game_codec
+    date_created: Mapped[DateTime] = mapped_column(DateTime, default=func.now())
+    
+    @property
+    def card_ids(self):
+        return list(self.cards)
+    
+    def to_dict(self):
+        """Get the hand as the hand APIs return it"""
+        return {
+            "name": self.name,
+            "cards": self.card_ids,
+            "created_at": self.date_created.isoformat() if self.date_created else None
+        }
+
 # Game State DB
+# A game is stored as its seed and deck plus an append-only list of actions (GameAction).
+# game_blob holds a snapshot (see game_codec) taken after snapshot_action_count actions,
+# so loading only replays the actions after it. Games saved before game_blob existed keep
+# a base64 pickled snapshot in game_data until their next snapshot is written.
 class GameState(db.Model):
     __tablename__ = "game_states"
+    __table_args__ = (db.Index("ix_game_states_user_id", "user_id", unique=True),)  # One game per user
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("users.id"))
-    game_data: Mapped[JSON] = mapped_column(JSON)  # Serialized game state
+    game_data: Mapped[JSON] = mapped_column(JSON)  # Legacy serialized game snapshot, null for new snapshots
+    game_blob: Mapped[bytes] = mapped_column(LargeBinary, nullable=True)  # Encoded game snapshot
+    seed: Mapped[int] = mapped_column(Integer, nullable=True)  # Game RNG seed
+    player_deck_ids: Mapped[JSON] = mapped_column(JSON, nullable=True)  # Card IDs the game was created with
+    snapshot_action_count: Mapped[int] = mapped_column(Integer, nullable=True, default=0)  # Actions included in game_data
+    version: Mapped[int] = mapped_column(Integer, nullable=True, default=0)  # Actions saved, compared and swapped by each save
     date_created: Mapped[DateTime] = mapped_column(DateTime, default=func.now())
     date_updated: Mapped[DateTime] = mapped_column(DateTime, default=func.now(), onupdate=func.now())
 
+# Game actions DB (append-only, one row per successful play card / end turn)
+class GameAction(db.Model):
+    __tablename__ = "game_actions"
+    __table_args__ = (db.Index("ix_game_actions_game_seq", "game_state_id", "seq", unique=True),)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    game_state_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("game_states.id"))
+    seq: Mapped[int] = mapped_column(Integer)  # 0-based position of the action in the game
+    action: Mapped[str] = mapped_column(String(16))  # Compact action, see Game._log_action
+
+# Number of actions between full snapshots of a game
+SNAPSHOT_INTERVAL = 8
+
+# Columns added to existing tables after they were created; db.create_all() only creates missing tables.
+# Types are SQL strings, or SQLAlchemy types for columns whose SQL differs between databases.
+SCHEMA_UPGRADES = {
+    "users": {
+        "legacy_data_migrated": "BOOLEAN DEFAULT FALSE",
+        "unlocked_cards_mask": "BIGINT DEFAULT 0",
+    },
+    "game_states": {
+        "seed": "INTEGER",
+        "player_deck_ids": "JSON",
+        "snapshot_action_count": "INTEGER DEFAULT 0",
+        "game_blob": LargeBinary(),
+        "version": "INTEGER DEFAULT 0",
+    },
+}
+
+# Statements that fill in a column for existing rows when upgrade_database() adds it
+SCHEMA_BACKFILLS = {
+    ("users", "unlocked_cards_mask"): [
+        "UPDATE users SET unlocked_cards_mask = COALESCE("
+        "(SELECT SUM(CAST(1 AS BIGINT) << card_id) FROM user_cards WHERE user_cards.user_id = users.id), 0)",
+    ],
+    ("game_states", "version"): [
+        "UPDATE game_states SET version = COALESCE("
+        "(SELECT MAX(seq) + 1 FROM game_actions WHERE game_actions.game_state_id = game_states.id), 0)",
+        "UPDATE game_states SET version = snapshot_action_count WHERE snapshot_action_count > version",
+        # Games pickled before seeds were saved load with seed 0 (see Game.__setstate__)
+        "UPDATE game_states SET seed = 0 WHERE seed IS NULL",
+    ],
+}
+
+def upgrade_database():
+    """Create missing tables and add any columns older databases don't have yet"""
+    db.create_all()
+    inspector = inspect(db.engine)
+    for table, columns in SCHEMA_UPGRADES.items():
+        existing_columns = {column["name"] for column in inspector.get_columns(table)}
+        for name, column_type in columns.items():
+            if name not in existing_columns:
+                if not isinstance(column_type, str):
+                    column_type = column_type.compile(dialect=db.engine.dialect)
+                with db.engine.begin() as connection:
+                    connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}"))
+                    for statement in SCHEMA_BACKFILLS.get((table, name), []):
+                        connection.execute(text(statement))
+    
+    # Indexes added to existing tables after they were created
+    for table in db.metadata.sorted_tables:
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                if table is GameState.__table__:
+                    remove_duplicate_game_states()
+                index.create(db.engine)
+
+def remove_duplicate_game_states():
+    """Delete all but each user's newest game row (left from before user_id was unique)"""
+    newest_ids = select(func.max(GameState.id)).group_by(GameState.user_id)
+    stale_ids = select(GameState.id).where(GameState.id.not_in(newest_ids))
+    with db.engine.begin() as connection:
+        connection.execute(delete(GameAction).where(GameAction.game_state_id.in_(stale_ids)))
+        connection.execute(delete(GameState).where(GameState.id.not_in(newest_ids)))
+
+@app.cli.command("upgrade-db")
+def upgrade_database_command():
+    """Create or upgrade the database schema"""
+    upgrade_database()
+    print("Database is up to date.")
+
+@app.cli.command("migrate-user-data")
+def migrate_user_data_command():
+    """Move every remaining user's cards and hands out of the legacy JSON fields, in batches"""
+    migrated = failed = 0
+    while True:
+        users = User.query.filter_by(legacy_data_migrated=False).order_by(User.id).offset(failed).limit(500).all()
+        if not users:
+            break
+        for user in users:
+            if migrate_legacy_user_data(user):
+                migrated += 1
+            else:
+                failed += 1
+    print(f"Migrated {migrated} users ({failed} failed).")
+
+def add_unlocked_cards(user, card_ids):
+    """Unlock cards for a user, skipping ones they already have. Returns the newly unlocked IDs.
+    
+    Safe against concurrent unlocks for the same user: the rows go in with INSERT ... ON
+    CONFLICT DO NOTHING (on SQLite and PostgreSQL), so only the request that inserted a
+    card reports it as new, and the mask is OR-ed in by the database.
+    """
+    requested_mask = card_mask(card_ids)
+    if not requested_mask:
+        return []
+    card_ids = card_ids_in_mask(requested_mask)
+    make_insert = UPSERT_INSERTS.get(db.engine.dialect.name)
+    if make_insert is None:
+        existing_ids = {card_id for (card_id,) in db.session.query(UserCard.card_id).filter(
+            UserCard.user_id == user.id, UserCard.card_id.in_(card_ids))}
+        new_card_ids = [card_id for card_id in card_ids if card_id not in existing_ids]
+        db.session.add_all(UserCard(user_id=user.id, card_id=card_id) for card_id in new_card_ids)
+    else:
+        statement = (make_insert(UserCard)
+                     .values([{"user_id": user.id, "card_id": card_id} for card_id in card_ids])
+                     .on_conflict_do_nothing(index_elements=[UserCard.user_id, UserCard.card_id])
+                     .returning(UserCard.card_id))
+        new_card_ids = sorted(card_id for (card_id,) in db.session.execute(statement))
+    User.query.filter_by(id=user.id).update(
+        {"unlocked_cards_mask": func.coalesce(User.unlocked_cards_mask, 0).op("|")(requested_mask)},
+        synchronize_session=False)
+    # Read the mask back from the database the next time it is used
+    db.session.expire(user, ["unlocked_cards_mask"])
+    return new_card_ids
+
+def load_saved_hands(user_id):
+    """Get a user's saved hands, oldest first"""
+    return UserHand.query.filter_by(user_id=user_id, is_current=False).order_by(UserHand.id).all()
+
+def load_current_hand(user_id):
+    """Get the hand a user battles with, or None if they haven't picked one"""
+    return UserHand.query.filter_by(user_id=user_id, is_current=True).first()
+
+def legacy_hand(user_id, hand_data, is_current=False):
+    """Make a UserHand from a hand in the legacy JSON format, or None if it isn't a valid hand"""
+    if not isinstance(hand_data, dict) or not isinstance(hand_data.get("cards"), list):
+        return None
+    card_ids = [card_id for card_id in hand_data["cards"] if isinstance(card_id, int) and card_id in CARD_ID_TO_NAME]
+    try:
+        date_created = datetime.fromisoformat(hand_data.get("created_at"))
+    except (TypeError, ValueError):
+        date_created = datetime.now()
+    return UserHand(user_id=user_id, is_current=is_current, name=str(hand_data.get("name", "Hand")),
+                    cards=bytes(card_ids), date_created=date_created)
+
+def migrate_legacy_user_data(user):
+    """Move a user's unlocked cards and hands from the legacy JSON fields into user_cards and user_hands.
+    
+    Users are migrated as they use the site (see load_user), and the rest with
+    `flask migrate-user-data`. The user's legacy_data_migrated flag is compared and
+    swapped first, so when two requests migrate the same user only one copies the data.
+    """
+    saved_hands_data, current_hand_data = user.misc1, user.misc2
+    try:
+        claimed = User.query.filter_by(id=user.id, legacy_data_migrated=False).update(
+            {"legacy_data_migrated": True, "misc1": None, "misc2": None}, synchronize_session=False)
+        if claimed:
+            user_collection = UserCollection.query.filter_by(user_id=user.id).first()
+            if user_collection is not None and isinstance(user_collection.unlocked_cards, list):
+                add_unlocked_cards(user, [card_id for card_id in user_collection.unlocked_cards
+                                          if card_id in CARD_ID_TO_NAME])
+                user_collection.unlocked_cards = None
+            
+            try:
+                hands_data = json.loads(saved_hands_data) if saved_hands_data else {}
+            except (json.JSONDecodeError, TypeError):
+                hands_data = {}
+            hands = hands_data.get("hands", []) if isinstance(hands_data, dict) else []
+            try:
+                current_hand = json.loads(current_hand_data) if current_hand_data else None
+            except (json.JSONDecodeError, TypeError):
+                current_hand = None
+            new_hands = [legacy_hand(user.id, hand) for hand in hands] + [legacy_hand(user.id, current_hand, True)]
+            db.session.add_all(hand for hand in new_hands if hand is not None)
+        db.session.commit()
+        return True
+    except Exception as e:
+        print(f"Error migrating user data: {e}")
+        db.session.rollback()
+        return False
+
+def encode_game_snapshot(game):
+    """Serialize a game for the game_blob column"""
+    return encode_game(game)
+
+# INSERT ... ON CONFLICT DO UPDATE statement builders by database dialect name
+UPSERT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+def upsert_game_state(values):
+    """Insert the user's game row, or overwrite it if they already have one.
+    
+    One statement on SQLite and PostgreSQL (using the unique user_id index); other
+    databases get an UPDATE, then an INSERT if no row was updated.
+    """
+    make_insert = UPSERT_INSERTS.get(db.engine.dialect.name)
+    if make_insert is None:
+        values = dict(values, date_created=func.now(), date_updated=func.now())
+        if not GameState.query.filter_by(user_id=values["user_id"]).update(values, synchronize_session=False):
+            db.session.add(GameState(**values))
+        return
+    statement = make_insert(GameState).values(**values)
+    changes = {name: statement.excluded[name] for name in values if name != "user_id"}
+    changes.update(date_created=func.now(), date_updated=func.now())
+    db.session.execute(statement.on_conflict_do_update(index_elements=[GameState.user_id], set_=changes))
+
+def append_game_action(user_id, seq, action):
+    """Add an action to the user's saved game in one INSERT ... SELECT through the user_id index"""
+    game_row = select(GameState.id, literal(seq, Integer), literal(action, String)).where(GameState.user_id == user_id)
+    db.session.execute(insert(GameAction).from_select(["game_state_id", "seq", "action"], game_row))
+
 # Helper functions for game state management
 def save_game_state(user_id, game):
-    """Save game state to database"""
+    """Save game state to database. Returns False if another request saved the game first.
+    
+    The row's version is the number of the game's actions saved. A save is a compare
+    and swap: one UPDATE moves the version from the count this game was loaded at to
+    its action count (WHERE version = ?), then the new actions are appended. Every
+    SNAPSHOT_INTERVAL actions and at game over the same UPDATE writes a fresh snapshot.
+    Nothing is locked in between, so of two requests that loaded the same version only
+    the first to save succeeds. A save also fails when the row holds a different game or
+    is gone, so a stale request can't bring back a replaced or cleared game. Only new
+    games, with no actions yet, replace the row with an upsert.
+    """
     try:
-        # Serialize the game object
-        game_bytes = pickle.dumps(game)
-        game_data = base64.b64encode(game_bytes).decode('utf-8')
-        
-        # Check if game state already exists for this user
-        existing_state = GameState.query.filter_by(user_id=user_id).first()
-        if existing_state:
-            existing_state.game_data = game_data
-            existing_state.date_updated = func.now()
+        first_seq = game.action_count - len(game.new_actions)
+        if game.action_count > 0:
+            changes = {"version": game.action_count}
+            if game.game_over or first_seq // SNAPSHOT_INTERVAL != game.action_count // SNAPSHOT_INTERVAL:
+                changes.update(game_data=None, game_blob=encode_game_snapshot(game),
+                               snapshot_action_count=game.action_count)
+            swapped = GameState.query.filter_by(user_id=user_id, seed=game.seed, version=first_seq).update(
+                changes, synchronize_session=False)
+            if not swapped:
+                # The game was changed, replaced or cleared by another request: this one lost the race
+                db.session.rollback()
+                return False
         else:
-            new_state = GameState(user_id=user_id, game_data=game_data)
-            db.session.add(new_state)
+            # A new game: replace whatever the row holds with a snapshot of it
+            game_state_ids = select(GameState.id).where(GameState.user_id == user_id)
+            db.session.execute(delete(GameAction).where(GameAction.game_state_id.in_(game_state_ids)))
+            upsert_game_state({
+                "user_id": user_id,
+                "game_data": None,
+                "game_blob": encode_game_snapshot(game),
+                "seed": game.seed,
+                "player_deck_ids": game.player_deck_ids,
+                "snapshot_action_count": game.action_count,
+                "version": game.action_count
+            })
+        for offset, action in enumerate(game.new_actions):
+            append_game_action(user_id, first_seq + offset, action)
         
         db.session.commit()
+        game.new_actions.clear()
         return True
     except Exception as e:
         print(f"Error saving game state: {e}")
@@ -98,23 +405,82 @@ def save_game_state(user_id, game):
         return False
 
 def load_game_state(user_id):
-    """Load game state from database"""
+    """Load game state from database: the latest snapshot plus a replay of the actions after it"""
     try:
         game_state = GameState.query.filter_by(user_id=user_id).first()
-        if game_state and game_state.game_data:
-            # Deserialize the game object
-            game_bytes = base64.b64decode(game_state.game_data.encode('utf-8'))
-            game = pickle.loads(game_bytes)
+        if game_state and (game_state.game_blob or game_state.game_data):
+            # Deserialize the game snapshot
+            if game_state.game_blob:
+                game = decode_game(game_state.game_blob)
+            else:
+                game = decode_legacy_snapshot(game_state.game_data)
+            
+            # Replay the actions taken since the snapshot
+            actions = (db.session.query(GameAction.action)
+                       .filter(GameAction.game_state_id == game_state.id, GameAction.seq >= game.action_count)
+                       .order_by(GameAction.seq))
+            for (action,) in actions:
+                game.apply_action(action)
+            game.new_actions.clear()
             return game
         return None
     except Exception as e:
         print(f"Error loading game state: {e}")
         return None
 
+def saved_game_version(user_id):
+    """Get (seed, version) for the user's saved game, or None. The version is the number of saved actions."""
+    row = db.session.query(GameState.seed, GameState.version).filter_by(user_id=user_id).first()
+    return tuple(row) if row is not None else None
+
+def load_game_replay(user_id):
+    """Get everything needed to replay the user's current game with Game.replay"""
+    game_cache.flush(user_id)
+    game_state = GameState.query.filter_by(user_id=user_id).first()
+    if not game_state or game_state.seed is None or game_state.player_deck_ids is None:
+        # Games saved before seeds and decks were stored can't be replayed
+        return None
+    actions = (db.session.query(GameAction.action)
+               .filter(GameAction.game_state_id == game_state.id)
+               .order_by(GameAction.seq))
+    return {
+        "seed": game_state.seed,
+        "player_deck_ids": game_state.player_deck_ids,
+        "actions": [action for (action,) in actions]
+    }
+
+def game_conflict_response(data):
+    """Reply to a request whose change lost a race with another request for the same game.
+    
+    Nothing was saved; the response carries the game as it is now so the client can catch up.
+    """
+    response = {
+        "success": False,
+        "conflict": True,
+        "message": "Your game was changed by another request. Please try again."
+    }
+    game = game_cache.get(current_user.id)
+    if game is not None:
+        response.update(game_state_payload(game, data))
+    return jsonify(response), 409
+
+def game_state_payload(game, data):
+    """Get the game state part of a response: only what changed since the client's
+    last-seen version when possible, otherwise a full snapshot"""
+    since_version = data.get('since_version') if data else None
+    if since_version is not None:
+        delta = game.get_state_delta(since_version, data.get('game_id'))
+        if delta is not None:
+            return {"game_state_delta": delta}
+    return {"game_state": game.get_game_state()}
+
 def clear_game_state(user_id):
     """Clear game state from database"""
+    game_cache.discard(user_id)
     try:
         # Use delete() with synchronize_session=False to avoid the warning
+        game_state_ids = db.session.query(GameState.id).filter_by(user_id=user_id)
+        GameAction.query.filter(GameAction.game_state_id.in_(game_state_ids.scalar_subquery())).delete(synchronize_session=False)
         deleted_count = GameState.query.filter_by(user_id=user_id).delete(synchronize_session=False)
         db.session.commit()
         return True
@@ -123,6 +489,20 @@ def clear_game_state(user_id):
         db.session.rollback()
         return False
 
+# Live games kept in memory between requests (see game_cache). Every move is saved at once
+# by default, which is safe with any number of workers. A single worker, or a deployment
+# that routes each user to the same worker, can set GAME_CACHE_EXCLUSIVE=1 to skip the
+# version check on cache hits and GAME_CACHE_FLUSH_INTERVAL (seconds) to save behind.
+game_cache = GameCache(
+    load_game_state, save_game_state, saved_game_version, app.app_context,
+    max_games=int(os.environ.get('GAME_CACHE_SIZE', 1000)),
+    max_bytes=int(os.environ.get('GAME_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+    idle_ttl=float(os.environ.get('GAME_CACHE_IDLE_TTL', 600)),
+    flush_interval=float(os.environ.get('GAME_CACHE_FLUSH_INTERVAL', 0)),
+    exclusive=os.environ.get('GAME_CACHE_EXCLUSIVE', '0') == '1'
+)
+atexit.register(game_cache.close)
+
 
 
 
@@ -138,19 +518,12 @@ def index():
         progress = XPSystem.get_progress_to_next_level(current_user.xp)
         
         # Check for pending rewards
-        user_collection = UserCollection.query.filter_by(user_id=current_user.id).first()
-        if user_collection and user_collection.unlocked_cards is not None:
-            unlocked_cards = user_collection.unlocked_cards if isinstance(user_collection.unlocked_cards, list) else []
-        else:
-            unlocked_cards = []
-        pending_rewards = XPSystem.get_pending_rewards(current_user.xp, unlocked_cards)
+        unlocked_cards = current_user.unlocked_card_ids
+        pending_rewards = XPSystem.get_pending_rewards(current_user.xp, current_user.unlocked_cards_mask)
         
         # Get all level rewards for display
         from xp_system import LEVEL_REWARDS, LEVEL_XP_REQUIREMENTS
         
-        # Create a mapping of card IDs to names for display
-        card_id_to_name = {card['id']: card['name'] for card in CHARACTERS}
-        
         return render_template('index.html', 
                              user=current_user, 
                              level=user_level,
@@ -160,7 +533,7 @@ def index():
                              pending_rewards=pending_rewards,
                              level_rewards=LEVEL_REWARDS,
                              level_xp_requirements=LEVEL_XP_REQUIREMENTS,
-                             card_id_to_name=card_id_to_name,
+                             card_id_to_name=CARD_ID_TO_NAME,
                              unlocked_cards=unlocked_cards)
     else:
         return render_template('index.html', 
@@ -181,18 +554,13 @@ def index():
 @login_required
 def single_player_game():
     # Check if user has a current hand selected
-    current_hand_data = current_user.misc2
-    if not current_hand_data:
+    current_hand = load_current_hand(current_user.id)
+    if not current_hand:
         # No hand selected, redirect to index with message
         flash('Please select a battle hand before starting a single player game.', 'warning')
         return redirect(url_for('index'))
     
-    try:
-        current_hand = json.loads(current_hand_data)
-        if not current_hand or 'cards' not in current_hand:
-            flash('Please select a valid battle hand before starting a single player game.', 'warning')
-            return redirect(url_for('index'))
-    except (json.JSONDecodeError, TypeError):
+    if not current_hand.cards:
         flash('Please select a valid battle hand before starting a single player game.', 'warning')
         return redirect(url_for('index'))
     
@@ -201,24 +569,9 @@ def single_player_game():
 @app.route('/collection')
 @login_required
 def collection():
-    # Get or create user collection
-    user_collection = UserCollection.query.filter_by(user_id=current_user.id).first()
-    if not user_collection:
-        user_collection = UserCollection(user_id=current_user.id, unlocked_cards=[])
-        db.session.add(user_collection)
-        db.session.commit()
-    else:
-        # Ensure the unlocked_cards field is properly initialized as a list
-        if user_collection.unlocked_cards is None:
-            user_collection.unlocked_cards = []
-            db.session.commit()
-    # Get all cards and mark which ones are unlocked
-    all_cards = CHARACTERS.copy()
-    unlocked_cards = user_collection.unlocked_cards if isinstance(user_collection.unlocked_cards, list) else []
-    unlocked_card_ids = set(unlocked_cards)
-    
-    for card in all_cards:
-        card['unlocked'] = card['id'] in unlocked_card_ids
+    # Get all cards and mark which ones are unlocked (on copies, the registry cards are shared)
+    unlocked_mask = current_user.unlocked_cards_mask
+    all_cards = [dict(card, unlocked=mask_has_card(unlocked_mask, card['id'])) for card in CARD_REGISTRY]
     
     # Separate owned and all cards
     owned_cards = [card for card in all_cards if card['unlocked']]
@@ -234,25 +587,9 @@ def collection():
 @login_required
 def create_hand():
     """Page where users can select 10 cards to create their hand"""
-    # Get or create user collection
-    user_collection = UserCollection.query.filter_by(user_id=current_user.id).first()
-    if not user_collection:
-        user_collection = UserCollection(user_id=current_user.id, unlocked_cards=[])
-        db.session.add(user_collection)
-        db.session.commit()
-    else:
-        # Ensure the unlocked_cards field is properly initialized as a list
-        if user_collection.unlocked_cards is None:
-            user_collection.unlocked_cards = []
-            db.session.commit()
-    
-    # Get all cards and mark which ones are unlocked
-    all_cards = CHARACTERS.copy()
-    unlocked_cards = user_collection.unlocked_cards if isinstance(user_collection.unlocked_cards, list) else []
-    unlocked_card_ids = set(unlocked_cards)
-    
-    for card in all_cards:
-        card['unlocked'] = card['id'] in unlocked_card_ids
+    # Get all cards and mark which ones are unlocked (on copies, the registry cards are shared)
+    unlocked_mask = current_user.unlocked_cards_mask
+    all_cards = [dict(card, unlocked=mask_has_card(unlocked_mask, card['id'])) for card in CARD_REGISTRY]
     
     # Separate owned and all cards
     owned_cards = [card for card in all_cards if card['unlocked']]
@@ -270,22 +607,11 @@ def unlock_card():
     
     if not card_id:
         return jsonify({"success": False, "message": "Card ID is required"})
-    
-    # Get or create user collection
-    user_collection = UserCollection.query.filter_by(user_id=current_user.id).first()
-    if not user_collection:
-        user_collection = UserCollection(user_id=current_user.id, unlocked_cards=[])
-        db.session.add(user_collection)
-    
-    # Ensure unlocked_cards is a list
-    if user_collection.unlocked_cards is None:
-        user_collection.unlocked_cards = []
-    elif not isinstance(user_collection.unlocked_cards, list):
-        user_collection.unlocked_cards = list(user_collection.unlocked_cards) if user_collection.unlocked_cards else []
+    if not isinstance(card_id, int) or card_id not in CARD_ID_TO_NAME:
+        return jsonify({"success": False, "message": "Unknown card ID"})
     
     # Add card to collection if not already there
-    if card_id not in user_collection.unlocked_cards:
-        user_collection.unlocked_cards.append(card_id)
+    if add_unlocked_cards(current_user, [card_id]):
         db.session.commit()
         return jsonify({"success": True, "message": f"Card unlocked!"})
     else:
@@ -295,17 +621,12 @@ def unlock_card():
 @login_required
 def get_collection():
     """Get user's collection data via API"""
-    user_collection = UserCollection.query.filter_by(user_id=current_user.id).first()
-    if not user_collection:
-        user_collection = UserCollection(user_id=current_user.id, unlocked_cards=[])
-        db.session.add(user_collection)
-        db.session.commit()
-    
-    unlocked_cards = user_collection.unlocked_cards if isinstance(user_collection.unlocked_cards, list) else []
+    unlocked_cards = current_user.unlocked_card_ids
     return jsonify({
         "unlocked_cards": unlocked_cards,
-        "total_cards": len(CHARACTERS),
-        "completion_percentage": round((len(unlocked_cards) / len(CHARACTERS)) * 100, 1)
+        "unlocked_cards_mask": current_user.unlocked_cards_mask,
+        "total_cards": len(CARD_REGISTRY),
+        "completion_percentage": round((len(unlocked_cards) / len(CARD_REGISTRY)) * 100, 1)
     })
 
 @app.route('/api/award-xp', methods=['POST'])
@@ -368,69 +689,24 @@ def claim_level_reward():
     if user_level < level:
         return jsonify({"success": False, "message": "You haven't reached this level yet"})
     
-    # Get or create user collection
-    user_collection = UserCollection.query.filter_by(user_id=current_user.id).first()
-    if not user_collection:
-        user_collection = UserCollection(user_id=current_user.id, unlocked_cards=[])
-        db.session.add(user_collection)
-        db.session.commit()  # Commit to ensure the collection exists
-    else:
-        # Ensure the unlocked_cards field is properly initialized as a list
-        if user_collection.unlocked_cards is None:
-            user_collection.unlocked_cards = []
-            db.session.commit()
-    
     # Get rewards for this level
     level_rewards = XPSystem.get_rewards_for_level(level)
     
     # Debug logging
     print(f"DEBUG: Claiming level {level} rewards")
     print(f"DEBUG: Level rewards: {level_rewards}")
-    print(f"DEBUG: Current unlocked cards: {user_collection.unlocked_cards}")
-    print(f"DEBUG: Unlocked cards type: {type(user_collection.unlocked_cards)}")
-    print(f"DEBUG: User collection ID: {user_collection.id}")
     print(f"DEBUG: User ID: {current_user.id}")
     
-    # Check which rewards haven't been claimed yet
-    new_rewards = []
-    
-    # Ensure unlocked_cards is a list and handle potential None values
-    if user_collection.unlocked_cards is None:
-        current_unlocked = []
-    elif isinstance(user_collection.unlocked_cards, list):
-        current_unlocked = user_collection.unlocked_cards.copy()
-    else:
-        # Handle case where it might be stored as a string or other format
-        try:
-            current_unlocked = list(user_collection.unlocked_cards) if user_collection.unlocked_cards else []
-        except:
-            current_unlocked = []
-    
-    print(f"DEBUG: Processing unlocked cards: {current_unlocked} (type: {type(current_unlocked)})")
-    
-    for card_id in level_rewards:
-        if card_id not in current_unlocked:
-            current_unlocked.append(card_id)
-            new_rewards.append(card_id)
-            print(f"DEBUG: Adding card ID {card_id} to collection")
-        else:
-            print(f"DEBUG: Card ID {card_id} already unlocked")
+    # Unlock the rewards that haven't been claimed yet
+    new_rewards = add_unlocked_cards(current_user, level_rewards)
+    print(f"DEBUG: Adding card IDs {new_rewards} to collection")
     
     if not new_rewards:
         return jsonify({"success": False, "message": "All rewards for this level have already been claimed"})
     
-    # Update the collection with the new list
-    user_collection.unlocked_cards = current_unlocked
-    user_collection.date_updated = func.now()
-    
     # Save changes
     db.session.commit()
     
-    # Refresh the object to get the updated data
-    db.session.refresh(user_collection)
-    
-    print(f"DEBUG: Final unlocked cards: {user_collection.unlocked_cards}")
-    
     return jsonify({
         "success": True,
         "message": f"Claimed rewards for level {level}!",
@@ -506,6 +782,98 @@ def clear_game_state_endpoint():
             "message": f"Error clearing game state: {str(e)}"
         })
 
+@app.route('/api/game-replay', methods=['GET'])
+@login_required
+def game_replay():
+    """Get the seed, deck and actions of the current game so it can be replayed"""
+    replay = load_game_replay(current_user.id)
+    if not replay:
+        return jsonify({
+            "success": False,
+            "message": "No active game found."
+        })
+    return jsonify({
+        "success": True,
+        **replay
+    })
+
+@app.route('/api/final-turn-hint', methods=['GET'])
+@login_required
+def final_turn_hint():
+    """Get the best plays for the player's final turn against the board as it stands"""
+    game = game_cache.get(current_user.id)
+    if not game:
+        return jsonify({
+            "success": False,
+            "message": "No active game found."
+        })
+    if game.game_over or game.turn != game.max_turns or game.current_player != "player":
+        return jsonify({
+            "success": False,
+            "message": "Hints are only available on your final turn."
+        })
+
+    # The opponent's reply isn't searched, so the hint never uses their hidden hand
+    time_budget = app.config['HINT_TIME_BUDGET']
+    solved = solve_last_turn(game, replies=False, time_budget=time_budget)
+    if solved is not None:
+        plays, expected_winner, _ = solved
+    else:
+        # Too many cards left to solve in time: plan the turn by search instead (it redraws hidden cards)
+        plays, _ = MCTSPlayer.search(game, time_budget)
+        expected_winner = None
+    return jsonify({
+        "success": True,
+        "plays": [
+            {"card_id": card_id, "card_name": CARD_ID_TO_NAME[card_id], "location_index": location_index}
+            for card_id, location_index in plays
+        ],
+        "expected_winner": expected_winner,
+        "exact": solved is not None
+    })
+
+@app.route('/api/hand-strength', methods=['POST'])
+@login_required
+def hand_strength():
+    """Estimate a saved hand's win/tie/loss rates against the opponent's all-cards deck.
+    
+    Games are simulated in the background; until they finish this returns status "pending"
+    and the client should ask again.
+    """
+    data = request.get_json(silent=True) or {}
+    hand_index = data.get('hand_index')
+    
+    hands = load_saved_hands(current_user.id)
+    if not isinstance(hand_index, int) or not 0 <= hand_index < len(hands):
+        return jsonify({
+            "success": False,
+            "message": "Invalid hand index."
+        })
+    
+    card_ids = hands[hand_index].card_ids
+    if not card_ids:
+        return jsonify({
+            "success": False,
+            "message": "That hand has no cards."
+        })
+    
+    status, estimate = hand_strength_estimator.estimate(card_ids)
+    if status == "busy":
+        return jsonify({
+            "success": False,
+            "message": "Too many hands are being tested right now. Please try again shortly."
+        }), 503
+    if status == "failed":
+        return jsonify({
+            "success": False,
+            "message": "Testing this hand failed. Please try again."
+        }), 500
+    return jsonify({
+        "success": True,
+        "status": status,
+        "estimate": estimate
+    }), 200 if status == "done" else 202
+
 @app.route('/api/reset-user', methods=['POST'])
 @login_required
 def reset_user():
@@ -516,38 +884,22 @@ def reset_user():
         current_user.last_daily_win = None
         
         # Reset hands data
-        current_user.misc1 = None
+        UserHand.query.filter_by(user_id=current_user.id, is_current=False).delete(synchronize_session=False)
         
         # Reset collection to cards 1-10
-        user_collection = UserCollection.query.filter_by(user_id=current_user.id).first()
-        if user_collection:
-            # Reset to cards 1-10
-            initial_cards = list(range(1, 11))  # Cards 1-10
-            user_collection.unlocked_cards = initial_cards
-            user_collection.date_updated = func.now()
-            db.session.commit()
-            db.session.refresh(user_collection)
-            print(f"DEBUG: Reset - Reset collection for user {current_user.id} to cards 1-10")
-            print(f"DEBUG: Reset - Collection now has {len(user_collection.unlocked_cards)} cards")
-        else:
-            # Create new collection with cards 1-10 if it doesn't exist
-            initial_cards = list(range(1, 11))  # Cards 1-10
-            user_collection = UserCollection(user_id=current_user.id, unlocked_cards=initial_cards)
-            db.session.add(user_collection)
-            db.session.commit()
-            print(f"DEBUG: Reset - Created new collection with cards 1-10 for user {current_user.id}")
-        
-        # Verify the reset worked
-        db.session.refresh(user_collection)
-        final_card_count = len(user_collection.unlocked_cards) if user_collection.unlocked_cards else 0
-        print(f"DEBUG: Reset - Final card count: {final_card_count}")
+        UserCard.query.filter_by(user_id=current_user.id).delete(synchronize_session=False)
+        current_user.unlocked_cards_mask = 0
+        initial_cards = list(range(1, 11))  # Cards 1-10
+        add_unlocked_cards(current_user, initial_cards)
+        db.session.commit()
+        print(f"DEBUG: Reset - Reset collection for user {current_user.id} to cards 1-10")
         
         return jsonify({
             "success": True,
             "message": "User data reset successfully! You now have cards 1-10 in your collection and all hands have been cleared.",
             "new_xp": 0,
             "new_level": 1,
-            "unlocked_cards": user_collection.unlocked_cards
+            "unlocked_cards": initial_cards
         })
         
     except Exception as e:
@@ -561,26 +913,22 @@ def reset_user():
 @login_required
 def debug_user():
     """Debug endpoint to check user state"""
-    user_collection = UserCollection.query.filter_by(user_id=current_user.id).first()
-    if user_collection and user_collection.unlocked_cards is not None:
-        unlocked_cards = user_collection.unlocked_cards if isinstance(user_collection.unlocked_cards, list) else []
-    else:
-        unlocked_cards = []
+    unlocked_cards = current_user.unlocked_card_ids
     
     # Get card names for unlocked cards
     card_names = []
     for card_id in unlocked_cards:
-        card = next((c for c in CHARACTERS if c['id'] == card_id), None)
+        card = CARD_REGISTRY.get(card_id)
         if card:
             card_names.append(f"{card['name']} (ID: {card_id})")
         else:
             card_names.append(f"Unknown Card (ID: {card_id})")
     
     # Get pending rewards
-    pending_rewards = XPSystem.get_pending_rewards(current_user.xp, unlocked_cards)
+    pending_rewards = XPSystem.get_pending_rewards(current_user.xp, current_user.unlocked_cards_mask)
     pending_names = []
     for reward in pending_rewards:
-        card = next((c for c in CHARACTERS if c['id'] == reward['card_id']), None)
+        card = CARD_REGISTRY.get(reward['card_id'])
         if card:
             pending_names.append(f"Level {reward['level']}: {card['name']} (ID: {reward['card_id']})")
         else:
@@ -595,7 +943,7 @@ def debug_user():
         "unlocked_card_names": card_names,
         "pending_rewards": pending_rewards,
         "pending_reward_names": pending_names,
-        "total_cards": len(CHARACTERS)
+        "total_cards": len(CARD_REGISTRY)
     })
 
 
@@ -605,45 +953,34 @@ def debug_user():
 def new_game():
     """Start a new single player game"""
     # Get the user's current hand
-    current_hand_data = current_user.misc2
-    if not current_hand_data:
+    current_hand = load_current_hand(current_user.id)
+    if not current_hand:
         return jsonify({
             "success": False,
             "message": "No hand selected. Please select a battle hand first."
         })
     
-    try:
-        current_hand = json.loads(current_hand_data)
-        if not current_hand or 'cards' not in current_hand:
-            return jsonify({
-                "success": False,
-                "message": "Invalid hand data. Please select a valid battle hand."
-            })
-        
-        # Clear any existing game state
-        clear_game_state(current_user.id)
-        
-        # Create new game with the current hand
-        from game import Game
-        game = Game(player_deck_ids=current_hand["cards"])
-        
-        # Save the game state
-        if save_game_state(current_user.id, game):
-            return jsonify({
-                "success": True,
-                "game_state": game.get_game_state(),
-                "hand_name": current_hand["name"]
-            })
-        else:
-            return jsonify({
-                "success": False,
-                "message": "Failed to save game state."
-            })
-        
-    except (json.JSONDecodeError, TypeError):
+    if not current_hand.cards:
         return jsonify({
             "success": False,
-            "message": "Error reading hand data. Please select a valid battle hand."
+            "message": "Invalid hand data. Please select a valid battle hand."
+        })
+    
+    # Create new game with the current hand
+    from game import Game
+    game = Game(player_deck_ids=current_hand.card_ids)
+    
+    # Save the game state, replacing any existing game in one upsert
+    if game_cache.put(current_user.id, game):
+        return jsonify({
+            "success": True,
+            "game_state": game.get_game_state(),
+            "hand_name": current_hand.name
+        })
+    else:
+        return jsonify({
+            "success": False,
+            "message": "Failed to save game state."
         })
 
 @app.route('/api/play-card', methods=['POST'])
@@ -663,7 +1000,7 @@ def play_card():
     
     try:
         # Load existing game state
-        game = load_game_state(current_user.id)
+        game = game_cache.get(current_user.id)
         if not game:
             return jsonify({
                 "success": False,
@@ -672,14 +1009,14 @@ def play_card():
         
         success, message = game.play_card(card_index, location_index, "player")
         
-        if success:
-            # Save the updated game state
-            save_game_state(current_user.id, game)
+        # Save the updated game state, unless another request changed the game first
+        if success and not game_cache.put(current_user.id, game):
+            return game_conflict_response(data)
         
         return jsonify({
             "success": success,
             "message": message,
-            "game_state": game.get_game_state()
+            **game_state_payload(game, data)
         })
         
     except Exception as e:
@@ -705,7 +1042,7 @@ def ai_play_card():
     
     try:
         # Load existing game state
-        game = load_game_state(current_user.id)
+        game = game_cache.get(current_user.id)
         if not game:
             return jsonify({
                 "success": False,
@@ -714,14 +1051,14 @@ def ai_play_card():
         
         success, message = game.play_card(card_index, location_index, "opponent")
         
-        if success:
-            # Save the updated game state
-            save_game_state(current_user.id, game)
+        # Save the updated game state, unless another request changed the game first
+        if success and not game_cache.put(current_user.id, game):
+            return game_conflict_response(data)
         
         return jsonify({
             "success": success,
             "message": message,
-            "game_state": game.get_game_state()
+            **game_state_payload(game, data)
         })
         
     except Exception as e:
@@ -734,9 +1071,11 @@ def ai_play_card():
 @login_required
 def ai_end_turn():
     """AI ends turn in single player game"""
+    data = request.get_json(silent=True) or {}
+    
     try:
         # Load existing game state
-        game = load_game_state(current_user.id)
+        game = game_cache.get(current_user.id)
         if not game:
             return jsonify({
                 "success": False,
@@ -746,14 +1085,14 @@ def ai_end_turn():
         # In single player mode, we can end the turn regardless of whose turn it is
         success, message = game.end_turn()
         
-        if success:
-            # Save the updated game state
-            save_game_state(current_user.id, game)
+        # Save the updated game state, unless another request changed the game first
+        if success and not game_cache.put(current_user.id, game):
+            return game_conflict_response(data)
         
         return jsonify({
             "success": success,
             "message": message,
-            "game_state": game.get_game_state()
+            **game_state_payload(game, data)
         })
         
     except Exception as e:
@@ -762,13 +1101,67 @@ def ai_end_turn():
             "message": f"Error with AI ending turn: {str(e)}"
         })
 
+@app.route('/api/ai-turn', methods=['POST'])
+@login_required
+def ai_turn():
+    """AI plays its whole turn (all cards plus end turn) in one request"""
+    data = request.get_json(silent=True) or {}
+    difficulty = data.get('difficulty', app.config['AI_DIFFICULTY'])
+    if difficulty != "random" and difficulty not in DIFFICULTY_LEVELS:
+        return jsonify({
+            "success": False,
+            "message": f"Unknown difficulty '{difficulty}'. Choose from: random, {', '.join(DIFFICULTY_LEVELS)}."
+        })
+    
+    try:
+        # Playing the AI's turn is safe to repeat, so a request that loses a race with
+        # another one retries once on the game as that request left it
+        for attempt in range(2):
+            # Load existing game state
+            game = game_cache.get(current_user.id)
+            if not game:
+                return jsonify({
+                    "success": False,
+                    "message": "No active game found. Please start a new game."
+                })
+
+            if game.game_over or game.current_player != "opponent":
+                return jsonify({
+                    "success": False,
+                    "message": "It is not the AI's turn.",
+                    **game_state_payload(game, data)
+                })
+
+            success, message, plays = AIPlayer.play_turn(game, difficulty=None if difficulty == "random" else difficulty)
+
+            # Save the updated game state once for the whole turn
+            if not success or game_cache.put(current_user.id, game):
+                break
+        else:
+            return game_conflict_response(data)
+
+        return jsonify({
+            "success": success,
+            "message": message,
+            "plays": plays,
+            **game_state_payload(game, data)
+        })
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Error with AI turn: {str(e)}"
+        })
+
 @app.route('/api/end-turn', methods=['POST'])
 @login_required
 def end_turn():
     """Player ends turn in single player game"""
+    data = request.get_json(silent=True) or {}
+    
     try:
         # Load existing game state
-        game = load_game_state(current_user.id)
+        game = game_cache.get(current_user.id)
         if not game:
             return jsonify({
                 "success": False,
@@ -777,14 +1170,14 @@ def end_turn():
         
         success, message = game.end_turn("player")
         
-        if success:
-            # Save the updated game state
-            save_game_state(current_user.id, game)
+        # Save the updated game state, unless another request changed the game first
+        if success and not game_cache.put(current_user.id, game):
+            return game_conflict_response(data)
         
         return jsonify({
             "success": success,
             "message": message,
-            "game_state": game.get_game_state()
+            **game_state_payload(game, data)
         })
         
     except Exception as e:
@@ -807,53 +1200,23 @@ def save_hand():
         })
     
     # Verify all selected cards are in user's collection
-    user_collection = UserCollection.query.filter_by(user_id=current_user.id).first()
-    if not user_collection:
-        return jsonify({
-            "success": False,
-            "message": "User collection not found."
-        })
-    
-    unlocked_cards = user_collection.unlocked_cards if isinstance(user_collection.unlocked_cards, list) else []
-    unlocked_card_ids = set(unlocked_cards)
-    
     for card_id in selected_cards:
-        if card_id not in unlocked_card_ids:
+        if not mask_has_card(current_user.unlocked_cards_mask, card_id):
             return jsonify({
                 "success": False,
                 "message": f"Card ID {card_id} is not in your collection."
             })
     
-    # Save the hand (we'll store it in the user's misc1 field for now)
-    # Format: {"hands": [{"name": "Hand 1", "cards": [1,2,3...]}, ...]}
-    try:
-        existing_data = json.loads(current_user.misc1) if current_user.misc1 else None
-        # Handle both old format (list) and new format (dict)
-        if isinstance(existing_data, list):
-            # Convert old format to new format
-            existing_hands = {"hands": []}
-        elif isinstance(existing_data, dict) and "hands" in existing_data:
-            existing_hands = existing_data
-        else:
-            existing_hands = {"hands": []}
-    except (json.JSONDecodeError, TypeError):
-        existing_hands = {"hands": []}
-    
     # Add new hand
-    hand_name = data.get('hand_name', f'Hand {len(existing_hands["hands"]) + 1}')
-    new_hand = {
-        "name": hand_name,
-        "cards": selected_cards,
-        "created_at": datetime.now().isoformat()
-    }
-    
-    existing_hands["hands"].append(new_hand)
+    saved_hands = load_saved_hands(current_user.id)
+    hand_name = data.get('hand_name', f'Hand {len(saved_hands) + 1}')
+    new_hand = UserHand(user_id=current_user.id, name=hand_name, cards=bytes(selected_cards),
+                        date_created=datetime.now())
+    db.session.add(new_hand)
     
     # Keep only the 3 most recent hands
-    if len(existing_hands["hands"]) > 3:
-        existing_hands["hands"] = existing_hands["hands"][-3:]
-    
-    current_user.misc1 = json.dumps(existing_hands)
+    for old_hand in saved_hands[:-2]:
+        db.session.delete(old_hand)
     db.session.commit()
     
     return jsonify({
@@ -866,37 +1229,10 @@ def save_hand():
 @login_required
 def get_hand():
     """Get the user's saved hands"""
-    try:
-        saved_hands = current_user.misc1
-        if saved_hands:
-            hands_data = json.loads(saved_hands)
-            # Handle both old format (list) and new format (dict)
-            if isinstance(hands_data, list):
-                # Old format - return empty hands list
-                return jsonify({
-                    "success": True,
-                    "hands": []
-                })
-            elif isinstance(hands_data, dict) and "hands" in hands_data:
-                return jsonify({
-                    "success": True,
-                    "hands": hands_data["hands"]
-                })
-            else:
-                return jsonify({
-                    "success": True,
-                    "hands": []
-                })
-        else:
-            return jsonify({
-                "success": True,
-                "hands": []
-            })
-    except (json.JSONDecodeError, TypeError):
-        return jsonify({
-            "success": True,
-            "hands": []
-        })
+    return jsonify({
+        "success": True,
+        "hands": [hand.to_dict() for hand in load_saved_hands(current_user.id)]
+    })
 
 @app.route('/api/delete-hand', methods=['POST'])
 @login_required
@@ -911,112 +1247,48 @@ def delete_hand():
             "message": "Hand index is required."
         })
     
-    try:
-        saved_hands = current_user.misc1
-        if saved_hands:
-            hands_data = json.loads(saved_hands)
-            # Handle both old format (list) and new format (dict)
-            if isinstance(hands_data, list):
-                # Old format - no hands to delete
-                return jsonify({
-                    "success": False,
-                    "message": "No hands found."
-                })
-            elif isinstance(hands_data, dict) and "hands" in hands_data:
-                hands = hands_data["hands"]
-                
-                if 0 <= hand_index < len(hands):
-                    # Remove the hand at the specified index
-                    deleted_hand = hands.pop(hand_index)
-                    hands_data["hands"] = hands
-                    current_user.misc1 = json.dumps(hands_data)
-                    db.session.commit()
-                    
-                    return jsonify({
-                        "success": True,
-                        "message": f"Hand '{deleted_hand['name']}' deleted successfully.",
-                        "hands": hands
-                    })
-                else:
-                    return jsonify({
-                        "success": False,
-                        "message": "Invalid hand index."
-                    })
-            else:
-                return jsonify({
-                    "success": False,
-                    "message": "No hands found."
-                })
-        else:
-            return jsonify({
-                "success": False,
-                "message": "No hands found."
-            })
-    except (json.JSONDecodeError, TypeError):
+    hands = load_saved_hands(current_user.id)
+    if not hands:
         return jsonify({
             "success": False,
-            "message": "Error reading hands data."
+            "message": "No hands found."
+        })
+    
+    if isinstance(hand_index, int) and 0 <= hand_index < len(hands):
+        # Remove the hand at the specified index
+        deleted_hand = hands.pop(hand_index)
+        db.session.delete(deleted_hand)
+        db.session.commit()
+        
+        return jsonify({
+            "success": True,
+            "message": f"Hand '{deleted_hand.name}' deleted successfully.",
+            "hands": [hand.to_dict() for hand in hands]
+        })
+    else:
+        return jsonify({
+            "success": False,
+            "message": "Invalid hand index."
         })
 
 @app.route('/api/get-user-hands', methods=['GET'])
 @login_required
 def get_user_hands():
     """Get user's hands for game hand selection"""
-    try:
-        saved_hands = current_user.misc1
-        if saved_hands:
-            hands_data = json.loads(saved_hands)
-            # Handle both old format (list) and new format (dict)
-            if isinstance(hands_data, list):
-                # Old format - return empty hands list
-                return jsonify({
-                    "success": True,
-                    "hands": []
-                })
-            elif isinstance(hands_data, dict) and "hands" in hands_data:
-                return jsonify({
-                    "success": True,
-                    "hands": hands_data["hands"]
-                })
-            else:
-                return jsonify({
-                    "success": True,
-                    "hands": []
-                })
-        else:
-            return jsonify({
-                "success": True,
-                "hands": []
-            })
-    except (json.JSONDecodeError, TypeError):
-        return jsonify({
-            "success": True,
-            "hands": []
-        })
+    return jsonify({
+        "success": True,
+        "hands": [hand.to_dict() for hand in load_saved_hands(current_user.id)]
+    })
 
 @app.route('/api/get-current-hand', methods=['GET'])
 @login_required
 def get_current_hand():
     """Get the user's currently selected hand"""
-    try:
-        # Get current hand from misc2 field
-        current_hand_data = current_user.misc2
-        if current_hand_data:
-            current_hand = json.loads(current_hand_data)
-            return jsonify({
-                "success": True,
-                "current_hand": current_hand
-            })
-        else:
-            return jsonify({
-                "success": True,
-                "current_hand": None
-            })
-    except (json.JSONDecodeError, TypeError):
-        return jsonify({
-            "success": True,
-            "current_hand": None
-        })
+    current_hand = load_current_hand(current_user.id)
+    return jsonify({
+        "success": True,
+        "current_hand": current_hand.to_dict() if current_hand else None
+    })
 
 @app.route('/api/set-current-hand', methods=['POST'])
 @login_required
@@ -1031,51 +1303,35 @@ def set_current_hand():
             "message": "Hand index is required."
         })
     
-    try:
-        # Get user's hands
-        saved_hands = current_user.misc1
-        if not saved_hands:
-            return jsonify({
-                "success": False,
-                "message": "No hands found. Please create a hand first."
-            })
+    # Get user's hands
+    hands = load_saved_hands(current_user.id)
+    if not hands:
+        return jsonify({
+            "success": False,
+            "message": "No hands found. Please create a hand first."
+        })
+    
+    if isinstance(hand_index, int) and 0 <= hand_index < len(hands):
+        # Set a copy of the selected hand as current, so it stays even if the saved hand is deleted
+        selected_hand = hands[hand_index]
+        current_hand = load_current_hand(current_user.id)
+        if current_hand is None:
+            current_hand = UserHand(user_id=current_user.id, is_current=True)
+            db.session.add(current_hand)
+        current_hand.name = selected_hand.name
+        current_hand.cards = selected_hand.cards
+        current_hand.date_created = selected_hand.date_created
+        db.session.commit()
         
-        hands_data = json.loads(saved_hands)
-        # Handle both old format (list) and new format (dict)
-        if isinstance(hands_data, list):
-            # Old format - no hands to select from
-            return jsonify({
-                "success": False,
-                "message": "No hands found. Please create a hand first."
-            })
-        elif isinstance(hands_data, dict) and "hands" in hands_data:
-            hands = hands_data["hands"]
-            
-            if 0 <= hand_index < len(hands):
-                # Set the selected hand as current
-                selected_hand = hands[hand_index]
-                current_user.misc2 = json.dumps(selected_hand)
-                db.session.commit()
-                
-                return jsonify({
-                    "success": True,
-                    "message": f"Hand '{selected_hand['name']}' set as current battle hand.",
-                    "hand_name": selected_hand['name']
-                })
-            else:
-                return jsonify({
-                    "success": False,
-                    "message": "Invalid hand index."
-                })
-        else:
-            return jsonify({
-                "success": False,
-                "message": "No hands found. Please create a hand first."
-            })
-    except (json.JSONDecodeError, TypeError):
+        return jsonify({
+            "success": True,
+            "message": f"Hand '{selected_hand.name}' set as current battle hand.",
+            "hand_name": selected_hand.name
+        })
+    else:
         return jsonify({
             "success": False,
-            "message": "Error reading hands data."
+            "message": "Invalid hand index."
         })
 
 @app.route('/auth', methods=['GET', 'POST'])
@@ -1136,13 +1392,9 @@ def register():
                 db.session.add(new_user)
                 db.session.commit()
                 
-                # Create user collection with cards 1-10 unlocked
+                # Unlock cards 1-10 for the new user
                 initial_cards = list(range(1, 11))  # Cards 1-10
-                user_collection = UserCollection(
-                    user_id=new_user.id,
-                    unlocked_cards=initial_cards
-                )
-                db.session.add(user_collection)
+                add_unlocked_cards(new_user, initial_cards)
                 db.session.commit()
                 
                 login_user(new_user)
@@ -1164,7 +1416,7 @@ def logout():
 
 if __name__ == "__main__":
     with app.app_context():
-        db.create_all()
+        upgrade_database()
     app.run(debug=True, port=5002)
 
 
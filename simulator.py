@@ -0,0 +1,269 @@
+# Simulator - Headless batch games for balance runs
+# This file plays whole games without Flask so cards and locations can be tuned with data
+#
+# Usage: python simulator.py --games 1000000 --workers 8 --seed 1 [--engine game]
+#
+# The default "batch" engine plays thousands of games at once in lockstep with
+# batch_engine.BatchGames, at roughly 80k games per second per core for the random
+# policy and 65k for greedy, stats included. It follows the same rules as Game, but
+# its random choices come from NumPy, so results agree with Game in distribution
+# rather than game for game.
+# "--engine game" plays each game through Game (about 2,500 games per second per core)
+# and is the one to use for policies that aren't in batch_engine.BATCH_POLICIES.
+
+import argparse
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from card_registry import CARDS_BY_ID
+from game import END_TURN, Game
+from ai_system import AIPlayer
+from batch_engine import BatchGames, mask_bits
+from locations_data import LOCATIONS
+
+
+def random_policy(game, player):
+    """Play a random affordable card to a random open location"""
+    return AIPlayer.choose_move(game, player)
+
+
+def greedy_policy(game, player):
+    """Play the most expensive affordable card (the strongest on ties) to a random location it can go"""
+    moves = AIPlayer.get_playable_moves(game, player)
+    if not moves:
+        return None
+    hand = game.player_hand if player == "player" else game.opponent_hand
+    return max(moves, key=lambda move: (CARDS_BY_ID[hand[move[0]]]["cost"], CARDS_BY_ID[hand[move[0]]]["power"],
+                                        random.random()))
+
+
+# Available policies, looked up by name so they can be sent to worker processes
+POLICIES = {
+    "random": random_policy,
+    "greedy": greedy_policy,
+}
+
+
+class SimulationStats:
+    """Per-card and per-location play/win counters for a batch of games"""
+    
+    def __init__(self):
+        self.games = 0
+        self.results = Counter()           # winner -> count
+        self.card_plays = Counter()        # card_id -> times played
+        self.card_wins = Counter()         # card_id -> times played by the winning side
+        self.card_ties = Counter()         # card_id -> times played in a tied game
+        self.location_games = Counter()    # location name -> games it appeared in
+        self.location_results = Counter()  # (location name, winner at location) -> count
+        self.elapsed = 0.0
+    
+    def record_game(self, game, played_cards):
+        """Record the outcome of a finished game and the cards each side played"""
+        self.games += 1
+        self.results[game.winner] += 1
+        
+        for player, card_ids in played_cards.items():
+            for card_id in card_ids:
+                self.card_plays[card_id] += 1
+                if game.winner == player:
+                    self.card_wins[card_id] += 1
+                elif game.winner == "tie":
+                    self.card_ties[card_id] += 1
+        
+        for location in game.locations:
+            player_power = game.calculate_location_power(location, "player")
+            opponent_power = game.calculate_location_power(location, "opponent")
+            if player_power > opponent_power:
+                location_winner = "player"
+            elif opponent_power > player_power:
+                location_winner = "opponent"
+            else:
+                location_winner = "tie"
+            self.location_games[location.name] += 1
+            self.location_results[(location.name, location_winner)] += 1
+    
+    def record_batch(self, batch):
+        """Record every game of a finished BatchGames"""
+        powers = batch.boards.location_powers()
+        winners = batch.boards.winners(powers)  # 1 player, -1 opponent, 0 tie
+        self.games += batch.n
+        opponent_wins, ties, player_wins = (winners[:, None] == (-1, 0, 1)).sum(axis=0).tolist()
+        self.results.update({"player": player_wins, "opponent": opponent_wins, "tie": ties})
+        
+        played = mask_bits(batch.played)  # (2, N, C)
+        plays = played.sum(axis=(0, 1))
+        wins = played[0, winners == 1].sum(axis=0) + played[1, winners == -1].sum(axis=0)
+        tied = played[:, winners == 0].sum(axis=(0, 1))
+        for card_id in plays.nonzero()[0].tolist():
+            self.card_plays[card_id] += int(plays[card_id])
+            self.card_wins[card_id] += int(wins[card_id])
+            self.card_ties[card_id] += int(tied[card_id])
+        
+        # Column 0 opponent, 1 tie, 2 player, like np.sign(player power - opponent power) + 1
+        outcomes = np.sign(powers[..., 0] - powers[..., 1]) + 1
+        counts = np.bincount((batch.location_ids * 3 + outcomes).ravel(), minlength=3 * len(LOCATIONS))
+        for location_id, location in enumerate(LOCATIONS):
+            opponent, tie, player = counts[3 * location_id:3 * location_id + 3].tolist()
+            if opponent + tie + player:
+                self.location_games[location["name"]] += opponent + tie + player
+                self.location_results.update({(location["name"], "player"): player,
+                                              (location["name"], "opponent"): opponent,
+                                              (location["name"], "tie"): tie})
+    
+    def merge(self, other):
+        """Add another batch's counters into this one"""
+        self.games += other.games
+        self.results.update(other.results)
+        self.card_plays.update(other.card_plays)
+        self.card_wins.update(other.card_wins)
+        self.card_ties.update(other.card_ties)
+        self.location_games.update(other.location_games)
+        self.location_results.update(other.location_results)
+        self.elapsed += other.elapsed
+    
+    def card_win_rates(self):
+        """Get win rate for each played card (ties count as half a win)"""
+        return {
+            card_id: (self.card_wins[card_id] + 0.5 * self.card_ties[card_id]) / plays
+            for card_id, plays in self.card_plays.items()
+        }
+    
+    def location_win_rates(self):
+        """Get the player/opponent/tie split at each location"""
+        rates = {}
+        for name, games in self.location_games.items():
+            rates[name] = {
+                outcome: self.location_results[(name, outcome)] / games
+                for outcome in ("player", "opponent", "tie")
+            }
+        return rates
+
+
+def play_game(player_policy, opponent_policy, player_deck_ids=None, seed=None, played_locations=None):
+    """Play one full game headlessly and return it with the card ids each side played
+    
+    If played_locations is a dict, it is filled with the location id of each play,
+    in the same order as the played card ids.
+    """
+    game = Game(player_deck_ids=player_deck_ids, seed=seed if seed is not None else random.getrandbits(31),
+                track_changes=False)
+    policies = {"player": player_policy, "opponent": opponent_policy}
+    played_cards = {"player": [], "opponent": []}
+    
+    while not game.game_over:
+        player = game.current_player
+        hand = game.player_hand if player == "player" else game.opponent_hand
+        while True:
+            move = policies[player](game, player)
+            if move is None:
+                break
+            played_cards[player].append(hand[move[0]])
+            if played_locations is not None:
+                played_locations.setdefault(player, []).append(game.locations[move[1]].location_id)
+            # Policies only return legal moves, so the checks and action log of play_card() are skipped
+            game.apply(move, undoable=False)
+        game.apply(END_TURN, undoable=False)
+    
+    return game, played_cards
+
+
+def run_batch(games, seed, player_policy="random", opponent_policy="random", player_deck_ids=None):
+    """Play a batch of games in this process with its own seed.
+    
+    Each game gets its own seed from a separate stream, so a game's deal and effects
+    don't depend on how many random choices the policies made in earlier games.
+    """
+    random.seed(seed)
+    game_seeds = random.Random(seed)
+    stats = SimulationStats()
+    start = time.perf_counter()
+    for _ in range(games):
+        game, played_cards = play_game(POLICIES[player_policy], POLICIES[opponent_policy], player_deck_ids,
+                                       seed=game_seeds.getrandbits(63))
+        stats.record_game(game, played_cards)
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def run_lockstep_batch(games, seed, player_policy="random", opponent_policy="random", player_deck_ids=None):
+    """Play a batch of games at once with BatchGames; policies are names in BATCH_POLICIES"""
+    stats = SimulationStats()
+    start = time.perf_counter()
+    batch = BatchGames(games, player_deck_ids, seed=seed)
+    batch.play(player_policy, opponent_policy)
+    stats.record_batch(batch)
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+# How each engine plays a batch, and its default batch size
+ENGINES = {
+    "batch": (run_lockstep_batch, 20000),
+    "game": (run_batch, 1000),
+}
+
+
+def simulate(games, workers=None, seed=0, player_policy="random", opponent_policy="random",
+             player_deck_ids=None, batch_size=None, engine="batch"):
+    """Play games across a process pool and return the merged stats"""
+    workers = workers or os.cpu_count() or 1
+    run, default_batch_size = ENGINES[engine]
+    batch_size = batch_size or default_batch_size
+    batches = []
+    remaining = games
+    while remaining > 0:
+        batches.append(min(batch_size, remaining))
+        remaining -= batches[-1]
+    
+    stats = SimulationStats()
+    start = time.perf_counter()
+    if workers == 1:
+        for index, count in enumerate(batches):
+            stats.merge(run(count, seed + index, player_policy, opponent_policy, player_deck_ids))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(run, count, seed + index, player_policy, opponent_policy, player_deck_ids)
+                for index, count in enumerate(batches)
+            ]
+            for future in futures:
+                stats.merge(future.result())
+    wall_time = time.perf_counter() - start
+    
+    return stats, wall_time
+
+
+def print_report(stats, wall_time, workers):
+    """Print throughput and balance stats for a run"""
+    print(f"Games: {stats.games}  workers: {workers}  wall time: {wall_time:.2f}s")
+    print(f"Throughput: {stats.games / wall_time:,.0f} games/sec total, "
+          f"{stats.games / stats.elapsed if stats.elapsed else 0:,.0f} games/sec/core")
+    print(f"Results: {dict(stats.results)}")
+    
+    print("\nCards (win rate when played):")
+    for card_id, rate in sorted(stats.card_win_rates().items(), key=lambda item: -item[1]):
+        print(f"  {CARDS_BY_ID[card_id]['name']:<15} {rate:6.1%}  ({stats.card_plays[card_id]} plays)")
+    
+    print("\nLocations (player / opponent / tie):")
+    for name, rates in stats.location_win_rates().items():
+        print(f"  {name:<17} {rates['player']:6.1%} {rates['opponent']:6.1%} {rates['tie']:6.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run headless Greek Snap games for balancing")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--player-policy", choices=POLICIES, default="random")
+    parser.add_argument("--opponent-policy", choices=POLICIES, default="random")
+    parser.add_argument("--engine", choices=ENGINES, default="batch")
+    args = parser.parse_args()
+    
+    stats, wall_time = simulate(args.games, args.workers, args.seed, args.player_policy, args.opponent_policy,
+                                engine=args.engine)
+    print_report(stats, wall_time, args.workers)
@@ -0,0 +1,210 @@
+# Solver - Exact search of a game's final turn
+# This file finds the best last turn for the side to move by trying every set of plays
+# and location choices, for the AI and for "best possible final turn" hints.
+#
+# The rest of the game is searched as it would really play out: plays and effects go
+# through Game.apply()/undo() on a fork, so random effects use the game's own RNG, and
+# if the other side still has to move, it answers with its actual hand. Hints for the
+# player pass replies=False so the opponent's hidden hand is never used.
+#
+# Turns with many cards left can take seconds to solve exactly, so callers on a request
+# path pass a time budget and fall back to another planner when the solver gives up.
+
+import time
+
+from card_registry import CARDS_BY_ID
+from effect_system import CARD_EFFECTS
+from game import END_TURN
+from zobrist import MASK, TranspositionTable, mix64
+
+# Scores are from the solving side's point of view: the result decides, power margin breaks ties
+WIN_SCORE = 1000
+
+# Memo entry kinds for alpha-beta results
+EXACT, LOWER_BOUND, UPPER_BOUND = range(3)
+
+
+class _OutOfTime(Exception):
+    """Raised inside the search when the solver's deadline passes"""
+
+
+class LastTurnSolver:
+    """Alpha-beta search over the final turn, remembering searched positions in a transposition table.
+
+    Plays without immediate On Reveal effects give the same result in any order,
+    so between immediate effects they are only tried in one order (increasing card
+    id and location).
+    """
+
+    # The clock is read once every this many searched positions
+    DEADLINE_CHECK_NODES = 32
+
+    def __init__(self, game, replies=True, table=None, deadline=None):
+        if game.game_over or game.turn != game.max_turns:
+            raise ValueError("The solver only handles a game on its final turn")
+        self.game = game.fork()
+        self.player = game.current_player
+        self.other = "opponent" if self.player == "player" else "player"
+        self.replies = replies  # False scores the board as soon as the solving side ends its turn
+        self.table = table if table is not None else TranspositionTable()  # key -> (score, kind, best move key)
+        self.deadline = deadline  # time.perf_counter() value to give up at, or None to search to the end
+        self.nodes = 0
+
+    def solve(self):
+        """Get (best plays as [(card_id, location_index), ...], expected winner, score), or None if time ran out"""
+        self.table.new_search()
+        try:
+            score = self._search(-WIN_SCORE * 2, WIN_SCORE * 2, None)
+        except _OutOfTime:
+            # Only finished positions were memoized, so the table stays usable
+            return None
+
+        # Follow the memo's best moves from the root for the solving side's line
+        plays = []
+        last_play = None
+        game = self.game
+        applied = []
+        while not game.game_over and game.current_player == self.player:
+            entry = self.table.get(self._position_key(last_play))
+            if entry is None or entry[2] is None or entry[2] == END_TURN:
+                break
+            move_key = entry[2]
+            move = self._find_move(move_key)
+            plays.append(move_key)
+            game.apply(move)
+            applied.append(move)
+            last_play = None if CARD_EFFECTS[move_key[0]].on_reveal_immediate else move_key
+        for move in reversed(applied):
+            game.undo(move)
+
+        if score > WIN_SCORE // 2:
+            winner = self.player
+        elif score < -WIN_SCORE // 2:
+            winner = self.other
+        else:
+            winner = "tie"
+        return plays, winner, score
+
+    def _search(self, alpha, beta, last_play):
+        """Minimax with alpha-beta; the solving side maximizes"""
+        game = self.game
+        self.nodes += 1
+        if (self.deadline is not None and not self.nodes % self.DEADLINE_CHECK_NODES
+                and time.perf_counter() > self.deadline):
+            raise _OutOfTime
+        if game.game_over or (not self.replies and game.current_player != self.player):
+            return self._score()
+
+        key = self._position_key(last_play)
+        entry = self.table.get(key)
+        if entry is not None:
+            score, kind, _ = entry
+            if kind == EXACT:
+                return score
+            if kind == LOWER_BOUND:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+            if alpha >= beta:
+                return score
+
+        maximizing = game.current_player == self.player
+        nodes_before = self.nodes
+        original_alpha, original_beta = alpha, beta
+        best_score = None
+        best_move_key = None
+        hand = game.player_hand if game.current_player == "player" else game.opponent_hand
+
+        for move, move_key in self._ordered_moves(hand, last_play):
+            if (move == END_TURN and not game.pending_on_reveal_effects
+                    and (game.current_player == "opponent" or not self.replies)):
+                # The last turn to search ends with nothing left to resolve, so the board is final
+                score = self._score()
+            else:
+                game.apply(move)
+                try:
+                    if move == END_TURN:
+                        score = self._search(alpha, beta, None)
+                    elif CARD_EFFECTS[move_key[0]].on_reveal_immediate:
+                        # Plays on either side of an immediate effect don't commute, so start a new group
+                        score = self._search(alpha, beta, None)
+                    else:
+                        score = self._search(alpha, beta, move_key)
+                finally:
+                    game.undo(move)
+
+            if best_score is None or (score > best_score if maximizing else score < best_score):
+                best_score, best_move_key = score, move_key
+            if maximizing:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+            if alpha >= beta:
+                break
+
+        if best_score <= original_alpha:
+            kind = UPPER_BOUND
+        elif best_score >= original_beta:
+            kind = LOWER_BOUND
+        else:
+            kind = EXACT
+        self.table.put(key, (best_score, kind, best_move_key), self.nodes - nodes_before)
+        return best_score
+
+    def _ordered_moves(self, hand, last_play):
+        """Get (move, move key) pairs worth trying, strongest cards first and END_TURN last"""
+        moves = []
+        seen = set()
+        for card_index, location_index in self.game.legal_moves():
+            move_key = (hand[card_index], location_index)
+            if move_key in seen:
+                continue
+            seen.add(move_key)
+            # Plain plays commute, so only try them in increasing order
+            if (last_play is not None and move_key <= last_play
+                    and not CARD_EFFECTS[move_key[0]].on_reveal_immediate):
+                continue
+            moves.append(((card_index, location_index), move_key))
+        moves.sort(key=lambda item: -CARDS_BY_ID[item[1][0]]["power"])
+        moves.append((END_TURN, END_TURN))
+        return moves
+
+    def _find_move(self, move_key):
+        """Turn a (card_id, location_index) key back into a move for the current hand"""
+        game = self.game
+        hand = game.player_hand if game.current_player == "player" else game.opponent_hand
+        return hand.index(move_key[0]), move_key[1]
+
+    def _position_key(self, last_play):
+        """Get a 64-bit key for everything that can still change the result"""
+        game = self.game
+        # The Zobrist hash covers the board, hands and counters; add what only the solver cares about
+        extra = hash((last_play, self.player, self.replies, game.rng.getstate(),
+                      tuple(game.pending_on_reveal_effects), tuple(game.pending_location_draw_effects)))
+        return game.position_hash() ^ mix64(extra & MASK)
+
+    def _score(self):
+        """Score the board for the solving side, the same way Game.calculate_winner() decides"""
+        locations_won = 0
+        margin = 0
+        for location in self.game.locations:
+            difference = location.total_power(self.player) - location.total_power(self.other)
+            margin += difference
+            if difference > 0:
+                locations_won += 1
+            elif difference < 0:
+                locations_won -= 1
+        if locations_won > 0:
+            return WIN_SCORE + margin
+        if locations_won < 0:
+            return -WIN_SCORE + margin
+        return margin
+
+
+def solve_last_turn(game, replies=True, table=None, time_budget=None):
+    """Get the best final turn for the side to move: (plays, expected winner, score).
+
+    With a time_budget in seconds, returns None if the search doesn't finish in time.
+    """
+    deadline = time.perf_counter() + time_budget if time_budget is not None else None
+    return LastTurnSolver(game, replies, table, deadline).solve()
@@ -65,6 +65,38 @@ class SinglePlayerGame {
         }
     }
 
+    stateVersionPayload() {
+        // Lets the server reply with only what changed since our last state
+        if (!this.gameState) {
+            return {};
+        }
+        return {
+            since_version: this.gameState.state_version,
+            game_id: this.gameState.game_id
+        };
+    }
+
+    applyStateResponse(data) {
+        // Responses carry either a full game state or the changes since our version
+        if (data.game_state) {
+            this.gameState = data.game_state;
+        } else if (data.game_state_delta) {
+            const delta = data.game_state_delta;
+            Object.assign(this.gameState, delta.fields);
+            for (const [index, location] of Object.entries(delta.locations)) {
+                this.gameState.locations[index] = location;
+            }
+            this.gameState.state_version = delta.state_version;
+        }
+    }
+
+    syncAfterConflict(data) {
+        // Another request (such as a double click) changed the game first; show it as the server has it
+        this.applyStateResponse(data);
+        this.isPlayerTurn = this.gameState.current_player === 'player';
+        this.updateUI();
+    }
+
     updateUI() {
         if (!this.gameState) {
             console.log('No game state available for UI update');
@@ -416,14 +448,15 @@ class SinglePlayerGame {
                 },
                 body: JSON.stringify({
                     card_index: cardIndex,
-                    location_index: locationIndex
+                    location_index: locationIndex,
+                    ...this.stateVersionPayload()
                 })
             });
             
             const data = await response.json();
             
             if (data.success) {
-                this.gameState = data.game_state;
+                this.applyStateResponse(data);
                 this.updateUI();
                 
                 // Check if game is over after playing card
@@ -432,6 +465,9 @@ class SinglePlayerGame {
                 }
                 // Note: AI moves only happen when player ends turn, not when playing individual cards
             } else {
+                if (data.conflict) {
+                    this.syncAfterConflict(data);
+                }
                 this.showError(data.message);
             }
         } catch (error) {
@@ -447,84 +483,42 @@ class SinglePlayerGame {
             current_player: this.gameState.current_player
         });
         
-        // Simple AI: play a random playable card to a random location
-        if (this.gameState.opponent_hand && this.gameState.opponent_hand.length > 0 && this.gameState.opponent_energy > 0) {
-            // Find playable cards
-            const playableCards = [];
-            for (let i = 0; i < this.gameState.opponent_hand.length; i++) {
-                const card = this.gameState.opponent_hand[i];
-                if (card.cost <= this.gameState.opponent_energy) {
-                    playableCards.push(i);
-                }
-            }
+        // The server picks and plays every AI card and ends the turn in one request
+        try {
+            const response = await fetch('/api/ai-turn', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify(this.stateVersionPayload())
+            });
             
-            console.log('Playable cards:', playableCards);
+            const data = await response.json();
             
-            if (playableCards.length > 0) {
-                // Find locations that aren't full
-                const availableLocations = [];
-                for (let i = 0; i < this.gameState.locations.length; i++) {
-                    const location = this.gameState.locations[i];
-                    if (location.opponent_cards.length < 4) {
-                        availableLocations.push(i);
-                    }
-                }
-                
-                console.log('Available locations:', availableLocations);
+            if (data.success) {
+                console.log('AI plays:', data.plays);
+                this.applyStateResponse(data);
+                this.isPlayerTurn = true;
+                this.updateUI();
                 
-                if (availableLocations.length > 0) {
-                    // Play a random playable card to a random available location
-                    const cardIndex = playableCards[Math.floor(Math.random() * playableCards.length)];
-                    const locationIndex = availableLocations[Math.floor(Math.random() * availableLocations.length)];
-                    
-                    console.log('AI playing card', cardIndex, 'to location', locationIndex);
-                    
-                    try {
-                        const response = await fetch('/api/ai-play-card', {
-                            method: 'POST',
-                            headers: {
-                                'Content-Type': 'application/json',
-                            },
-                            body: JSON.stringify({
-                                card_index: cardIndex,
-                                location_index: locationIndex
-                            })
-                        });
-                        
-                        const data = await response.json();
-                        
-                        if (data.success) {
-                            this.gameState = data.game_state;
-                            this.updateUI();
-                            
-                            // Check if game is over after AI move
-                            if (this.gameState.game_over) {
-                                this.showGameOver({ winner: this.gameState.winner });
-                            } else {
-                                // Continue AI turn if it can play more cards
-                                setTimeout(() => {
-                                    this.makeAIMove();
-                                }, 500);
-                            }
-                        } else {
-                            console.log('AI play failed:', data.message);
-                            // If AI can't play this card, end the turn automatically
-                            this.endAITurn();
-                        }
-                    } catch (error) {
-                        console.error('Error with AI move:', error);
-                        this.endAITurn();
-                    }
+                // Check if game is over
+                if (this.gameState.game_over) {
+                    this.showGameOver({ winner: this.gameState.winner });
+                }
+            } else {
+                console.log('AI turn failed:', data.message);
+                this.applyStateResponse(data);
+                if (this.gameState.current_player === 'player') {
+                    // The AI turn was already played, just sync with the server
+                    this.isPlayerTurn = true;
+                    this.updateUI();
                 } else {
-                    console.log('No available locations, ending AI turn');
+                    // Fall back to just ending the AI turn
                     this.endAITurn();
                 }
-            } else {
-                console.log('No playable cards, ending AI turn');
-                this.endAITurn();
             }
-        } else {
-            console.log('AI has no hand or energy, ending turn');
+        } catch (error) {
+            console.error('Error with AI turn:', error);
             this.endAITurn();
         }
     }
@@ -538,13 +532,14 @@ class SinglePlayerGame {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
-                }
+                },
+                body: JSON.stringify(this.stateVersionPayload())
             });
             
             const data = await response.json();
             
             if (data.success) {
-                this.gameState = data.game_state;
+                this.applyStateResponse(data);
                 this.isPlayerTurn = true;
                 this.updateUI();
                 
@@ -571,13 +566,14 @@ class SinglePlayerGame {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
-                }
+                },
+                body: JSON.stringify(this.stateVersionPayload())
             });
             
             const data = await response.json();
             
             if (data.success) {
-                this.gameState = data.game_state;
+                this.applyStateResponse(data);
                 this.isPlayerTurn = false;
                 this.updateUI();
                 
@@ -591,6 +587,9 @@ class SinglePlayerGame {
                     }, 1000);
                 }
             } else {
+                if (data.conflict) {
+                    this.syncAfterConflict(data);
+                }
                 this.showError(data.message);
             }
         } catch (error) {
@@ -0,0 +1,211 @@
+# Synergy - Card pair and card/location win-rate matrices for balancing
+# This file plays many headless games across all cores and measures how much better a
+# card does with another card, against another card, or at a particular location than
+# its own win rate alone would predict.
+#
+# Win rates are from one side's point of view and count ties as half a win. With a
+# card's advantage a(i) = WR(i) - WR(all), the matrices hold:
+#   synergy[i, j]        = WR(i and j on the same side) - (WR(all) + a(i) + a(j))
+#   versus[i, j]         = WR(i against j)              - (WR(all) + a(i) - a(j))
+#   card_location[i, l]  = WR(i played at l)            - WR(i)
+# Cells with fewer than --min-samples games are NaN.
+#
+# Counts are saved to <out>/partial.npz after every chunk of games, so a stopped run
+# picks up where it left off when started again with the same options.
+#
+# Usage: python synergy.py --games 200000 --out synergy_results
+
+import argparse
+import csv
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from card_registry import CARD_REGISTRY, CARDS_BY_ID
+from locations_data import LOCATIONS
+from simulator import POLICIES, play_game
+
+CARD_IDS = sorted(CARD_REGISTRY.ids)
+CARD_INDEX = {card_id: index for index, card_id in enumerate(CARD_IDS)}
+SIDES = ("player", "opponent")
+# Points for a side's result; halved when turned into win rates
+POINTS = {"win": 2, "tie": 1}  # A loss scores 0
+
+
+class SynergyCounts:
+    """Games and points for each card pair, card matchup and card/location pairing.
+    
+    Every game is counted once from each side. Card pairs count the cards a side
+    played, so pair_games[i, i] is the number of sides that played card i.
+    """
+    
+    FIELDS = ("pair_games", "pair_points", "versus_games", "versus_points", "location_games", "location_points")
+    
+    def __init__(self):
+        cards, locations = len(CARD_IDS), len(LOCATIONS)
+        self.sides = 0
+        self.points = 0
+        self.pair_games = np.zeros((cards, cards), dtype=np.int64)
+        self.pair_points = np.zeros((cards, cards), dtype=np.int64)
+        self.versus_games = np.zeros((cards, cards), dtype=np.int64)
+        self.versus_points = np.zeros((cards, cards), dtype=np.int64)
+        self.location_games = np.zeros((cards, locations), dtype=np.int64)
+        self.location_points = np.zeros((cards, locations), dtype=np.int64)
+    
+    def add_sides(self, played, opposed, at_location, points):
+        """Count a batch of sides at once.
+        
+        played and opposed are (sides, cards) 0/1 arrays of the cards each side and
+        its opponent played, at_location is (sides, cards, locations) and points is
+        each side's result from POINTS.
+        """
+        scored = played * points[:, None]
+        self.sides += len(points)
+        self.points += int(points.sum())
+        self.pair_games += played.T @ played
+        self.pair_points += scored.T @ played
+        self.versus_games += played.T @ opposed
+        self.versus_points += scored.T @ opposed
+        self.location_games += at_location.sum(axis=0)
+        self.location_points += np.tensordot(points, at_location, axes=1)
+    
+    def merge(self, other):
+        """Add another chunk's counts into this one"""
+        self.sides += other.sides
+        self.points += other.points
+        for field in self.FIELDS:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+    
+    def save(self, path, done_chunks, options):
+        """Write the counts and finished chunk numbers, replacing the file in one step"""
+        temp_path = path + ".tmp.npz"
+        np.savez(temp_path, sides=self.sides, points=self.points, done_chunks=np.array(sorted(done_chunks)),
+                 options=np.array(options), **{field: getattr(self, field) for field in self.FIELDS})
+        os.replace(temp_path, path)
+    
+    @classmethod
+    def load(cls, path, options):
+        """Get (counts, finished chunk numbers) from a partial file written with the same options"""
+        with np.load(path) as data:
+            if data["options"].tolist() != list(options):
+                raise ValueError(f"{path} was written with different options {data['options'].tolist()}; "
+                                 f"use those or a new --out directory")
+            counts = cls()
+            counts.sides = int(data["sides"])
+            counts.points = int(data["points"])
+            for field in cls.FIELDS:
+                setattr(counts, field, data[field])
+            return counts, set(data["done_chunks"].tolist())
+    
+    def matrices(self, min_samples=100):
+        """Get the (synergy, versus, card_location) win-rate delta matrices"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            overall = self.points / (2 * self.sides) if self.sides else 0.5
+            card_rate = np.diag(self.pair_points) / (2 * np.diag(self.pair_games))
+            advantage = card_rate - overall
+            
+            synergy = self.pair_points / (2 * self.pair_games) - (overall + advantage[:, None] + advantage[None, :])
+            versus = self.versus_points / (2 * self.versus_games) - (overall + advantage[:, None] - advantage[None, :])
+            card_location = self.location_points / (2 * self.location_games) - card_rate[:, None]
+        
+        synergy[self.pair_games < min_samples] = np.nan
+        np.fill_diagonal(synergy, np.nan)
+        versus[self.versus_games < min_samples] = np.nan
+        card_location[self.location_games < min_samples] = np.nan
+        return synergy, versus, card_location
+
+
+def run_chunk(games, seed, player_policy="greedy", opponent_policy="greedy"):
+    """Play a chunk of games in this process and count them from both sides"""
+    random.seed(seed)  # Policies break ties with the global RNG
+    game_seeds = np.random.default_rng(seed).integers(0, 1 << 62, size=games)
+    played = np.zeros((games, 2, len(CARD_IDS)), dtype=np.int64)
+    at_location = np.zeros((games, 2, len(CARD_IDS), len(LOCATIONS)), dtype=np.int64)
+    points = np.zeros((games, 2), dtype=np.int64)
+    for g, game_seed in enumerate(game_seeds):
+        played_locations = {}
+        game, played_cards = play_game(POLICIES[player_policy], POLICIES[opponent_policy], seed=int(game_seed),
+                                       played_locations=played_locations)
+        for s, side in enumerate(SIDES):
+            card_indexes = [CARD_INDEX[card_id] for card_id in played_cards[side]]
+            played[g, s, card_indexes] = 1
+            at_location[g, s, card_indexes, played_locations.get(side, [])] = 1
+            if game.winner == side:
+                points[g, s] = POINTS["win"]
+            elif game.winner == "tie":
+                points[g, s] = POINTS["tie"]
+    
+    counts = SynergyCounts()
+    # Each side's opponent is the other row of the same game
+    counts.add_sides(played.reshape(games * 2, -1), played[:, ::-1].reshape(games * 2, -1),
+                     at_location.reshape(games * 2, len(CARD_IDS), len(LOCATIONS)), points.reshape(-1))
+    return counts
+
+
+def sweep(games, out_dir, workers=None, seed=0, player_policy="greedy", opponent_policy="greedy", chunk_size=2000):
+    """Play all chunks not already in out_dir across a process pool and return the merged counts"""
+    workers = workers or os.cpu_count() or 1
+    chunks = [min(chunk_size, games - start) for start in range(0, games, chunk_size)]
+    options = (str(seed), str(chunk_size), player_policy, opponent_policy)
+    partial_path = os.path.join(out_dir, "partial.npz")
+    os.makedirs(out_dir, exist_ok=True)
+    
+    if os.path.exists(partial_path):
+        counts, done_chunks = SynergyCounts.load(partial_path, options)
+        print(f"Resuming: {len(done_chunks)} chunks ({counts.sides // 2} games) already played")
+    else:
+        counts, done_chunks = SynergyCounts(), set()
+    todo = [index for index in range(len(chunks)) if index not in done_chunks]
+    
+    start = time.perf_counter()
+    played = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(run_chunk, chunks[index], seed + index, player_policy, opponent_policy): index
+            for index in todo
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            counts.merge(future.result())
+            done_chunks.add(index)
+            counts.save(partial_path, done_chunks, options)
+            played += chunks[index]
+            elapsed = time.perf_counter() - start
+            print(f"  chunk {len(done_chunks)}/{len(chunks)}  {played / elapsed:,.0f} games/sec", flush=True)
+    return counts
+
+
+def write_matrix(out_dir, name, matrix, row_labels, column_labels):
+    """Save a matrix as <name>.npy and as a labelled <name>.csv"""
+    np.save(os.path.join(out_dir, name + ".npy"), matrix)
+    with open(os.path.join(out_dir, name + ".csv"), "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow([""] + column_labels)
+        for label, row in zip(row_labels, matrix):
+            writer.writerow([label] + ["" if np.isnan(value) else f"{value:.4f}" for value in row])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build card synergy and card/location win-rate matrices")
+    parser.add_argument("--games", type=int, default=200000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--min-samples", type=int, default=100)
+    parser.add_argument("--player-policy", choices=POLICIES, default="greedy")
+    parser.add_argument("--opponent-policy", choices=POLICIES, default="greedy")
+    parser.add_argument("--out", default="synergy_results")
+    args = parser.parse_args()
+    
+    counts = sweep(args.games, args.out, args.workers, args.seed, args.player_policy, args.opponent_policy,
+                   args.chunk_size)
+    synergy, versus, card_location = counts.matrices(args.min_samples)
+    card_names = [CARDS_BY_ID[card_id]["name"] for card_id in CARD_IDS]
+    location_names = [location["name"] for location in LOCATIONS]
+    write_matrix(args.out, "synergy", synergy, card_names, card_names)
+    write_matrix(args.out, "versus", versus, card_names, card_names)
+    write_matrix(args.out, "card_location", card_location, card_names, location_names)
+    print(f"Wrote synergy, versus and card_location matrices for {counts.sides // 2} games to {args.out}/")
@@ -1,6 +1,8 @@
 # XP System Configuration
 # This file makes it super easy to configure levels and rewards
 
+from card_registry import card_mask, mask_has_card
+
 # XP required for each level (level 1 starts at 0 XP)
 LEVEL_XP_REQUIREMENTS = {
     1: 0,      # Starting level
@@ -48,6 +50,9 @@ XP_SOURCES = {
     "perfect_game": 0, # XP for winning without losing any locations
 }
 
+# Each level's rewards as a card mask (see card_registry), for bitwise checks against unlocked cards
+LEVEL_REWARD_MASKS = {level: card_mask(card_ids) for level, card_ids in LEVEL_REWARDS.items()}
+
 class XPSystem:
     @staticmethod
     def get_level_from_xp(xp):
@@ -93,15 +98,17 @@ class XPSystem:
         return LEVEL_REWARDS.get(level, [])
     
     @staticmethod
-    def get_pending_rewards(user_xp, unlocked_cards):
-        """Get rewards that should be given to user but haven't been yet"""
+    def get_pending_rewards(user_xp, unlocked_mask):
+        """Get rewards that should be given to user but haven't been yet (unlocked_mask is a card mask)"""
         current_level = XPSystem.get_level_from_xp(user_xp)
         pending_rewards = []
         
         for level in range(1, current_level + 1):
-            level_rewards = LEVEL_REWARDS.get(level, [])
-            for card_id in level_rewards:
-                if card_id not in unlocked_cards:
+            missing = LEVEL_REWARD_MASKS.get(level, 0) & ~unlocked_mask
+            if not missing:
+                continue
+            for card_id in LEVEL_REWARDS[level]:
+                if mask_has_card(missing, card_id):
                     pending_rewards.append({
                         'level': level,
                         'card_id': card_id
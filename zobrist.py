@@ -0,0 +1,107 @@
+# Zobrist Hashing - 64-bit position keys and a transposition table for AI search
+# Every (place, card) pair has a fixed random key and a position's hash combines the keys
+# of everything in it. Keys are added rather than XORed so that two copies of a card
+# don't cancel out, and hashes are updated as cards move instead of being recomputed.
+
+import random
+
+from card_registry import CARD_REGISTRY
+from locations_data import LOCATIONS
+
+MASK = (1 << 64) - 1
+SIDES = ("player", "opponent")
+
+_keys = random.Random(0x5A0B)  # Fixed seed so hashes are the same in every process
+
+
+def _random_keys(count):
+    return [_keys.getrandbits(64) for _ in range(count)]
+
+
+_CARD_SLOTS = max(CARD_REGISTRY.ids) + 1
+
+# LOCATION_CARD_KEYS[location_id][side][card_id], side 0 = player, 1 = opponent
+LOCATION_CARD_KEYS = [[_random_keys(_CARD_SLOTS) for _ in SIDES] for _ in LOCATIONS]
+# HAND_KEYS[side][card_id]
+HAND_KEYS = {side: _random_keys(_CARD_SLOTS) for side in SIDES}
+# Keys for small integer fields (energy, turn, ...), by field number and value
+_SCALAR_KEYS = [_random_keys(64) for _ in range(16)]
+
+
+def mix64(value):
+    """Scramble a 64-bit int (SplitMix64 finalizer)"""
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK
+    return value ^ (value >> 31)
+
+
+def scalar_key(field, value):
+    """Get the key for an integer field having a value"""
+    if 0 <= value < 64:
+        return _SCALAR_KEYS[field][value]
+    return mix64((field << 56) ^ (value & ((1 << 56) - 1)))
+
+
+def location_card_key(location_id, player, card_id):
+    """Get the key for a card on a side of a location"""
+    return LOCATION_CARD_KEYS[location_id][0 if player == "player" else 1][card_id]
+
+
+class TranspositionTable:
+    """Fixed-size table of search results keyed by 64-bit position hashes.
+
+    Each hash maps to one slot. A full slot is replaced by a result that took at
+    least as much work to compute, or by anything once the stored entry is from an
+    earlier search (see new_search()).
+    """
+
+    def __init__(self, size=1 << 16):
+        self.size = size
+        self.slots = [None] * size  # (key, value, work, generation)
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def new_search(self):
+        """Start a new search, so entries from earlier searches give way to new ones"""
+        self.generation += 1
+
+    def get(self, key):
+        """Get the stored value for a position hash, or None"""
+        self.probes += 1
+        entry = self.slots[key % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1]
+        return None
+
+    def put(self, key, value, work=0):
+        """Store a value for a position hash; work is how much search it saves (e.g. nodes searched)"""
+        index = key % self.size
+        entry = self.slots[index]
+        if entry is not None and entry[0] != key:
+            if entry[3] == self.generation and entry[2] > work:
+                return
+            self.replacements += 1
+        self.slots[index] = (key, value, work, self.generation)
+        self.stores += 1
+
+    def hit_rate(self):
+        """Get the share of lookups that found an entry"""
+        return self.hits / self.probes if self.probes else 0.0
+
+    def stats(self):
+        """Get the counters as a dict"""
+        return {
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hit_rate(),
+            "stores": self.stores,
+            "replacements": self.replacements,
+        }
+
+    def clear(self):
+        """Drop all entries and reset the counters"""
+        self.__init__(self.size)